@@ -0,0 +1,83 @@
+"""
+Cost of `EasyFlake.get_id()` in nanoseconds per ID, compared with the former implementation
+which created a `TimeSequence` for each ID and looked up the node ID and the shift every time.
+
+    python benchmarks/bench_get_id.py [--number 200000]
+"""
+import argparse
+import timeit
+from multiprocessing import Value
+
+import click
+
+from easyflake import EasyFlake
+from easyflake.sequence import TimeSequence, TimeSequenceProvider
+
+
+class LegacyTimeSequenceProvider(TimeSequenceProvider):
+    """The timestamp and the next sequence value packed into a single shared word."""
+
+    def next(self):
+        if not hasattr(self, "_packed"):
+            self._packed = Value("Q", 0)
+            self._packed_bits = self._sequence_max.bit_length() + 1
+        while True:
+            with self._packed.get_lock():
+                current = self._clock.current()
+                future = self._packed.value >> self._packed_bits
+                if current > future:
+                    seq = 0
+                    break
+                seq = self._packed.value & (2**self._packed_bits - 1)
+                if seq <= self._sequence_max:
+                    break
+            self._clock.sleep(current, future)
+
+        timestamp = self._clock.current()
+        self._packed.value = ((timestamp << self._packed_bits) | seq) + 1
+        return TimeSequence(timestamp, seq)
+
+
+class LegacyEasyFlake(EasyFlake):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        node_id = self.node_id
+        self._node_id_provider = lambda: node_id
+        self._sequence_provider.__class__ = LegacyTimeSequenceProvider
+
+    @property
+    def node_id(self):
+        if hasattr(self, "_node_id_provider"):
+            return self._node_id_provider()
+        return super().node_id
+
+    def get_id(self):
+        seq = self._sequence_provider.next()
+        return (
+            (seq.timestamp << (self._sequence_bits + self._node_id_bits))
+            | (self.node_id << self._sequence_bits)
+            | seq.value
+        )
+
+
+def measure(ef: EasyFlake, number: int) -> float:
+    elapsed = min(timeit.repeat(ef.get_id, number=number, repeat=5))
+    return elapsed / number * 1_000_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # a large sequence so that the benchmark does not wait for the next tick
+    options = {"node_id": 1, "node_id_bits": 4, "sequence_bits": 20}
+    legacy = measure(LegacyEasyFlake(**options), args.number)
+    current = measure(EasyFlake(**options), args.number)
+
+    click.echo(f"legacy:  {legacy:8.1f} ns/ID")
+    click.echo(f"current: {current:8.1f} ns/ID ({legacy / current:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Startup time and RSS of each listener mode of `NodeIdPool`.
+
+Each mode runs in a fresh interpreter. The startup time is from creating the pool until the
+first node ID is returned, and the RSS is the sum of this process and the listener process
+(if any) after that, which counts the pages shared by fork twice. The pool hands out
+a constant node ID, so no server is involved.
+
+    python benchmarks/bench_listener.py [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import click
+
+from easyflake.node import BaseNodeIdPool
+
+MODES = ["process", "thread", "asyncio"]
+
+
+class StaticNodeIdPool(BaseNodeIdPool):
+    def listen(self):
+        while True:
+            yield 1
+
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0  # pragma: nocover
+
+
+def run(mode: str):
+    start = time.perf_counter()
+    pool = StaticNodeIdPool("static", 8, listener=mode)
+    if mode == "asyncio":
+        asyncio.run(pool.aget())
+    else:
+        pool.get()
+    elapsed = time.perf_counter() - start
+
+    rss = rss_kib(os.getpid())
+    if mode == "process":
+        rss += rss_kib(pool._listener.pid)
+    click.echo(json.dumps({"startup": elapsed, "rss": rss}))
+    pool.stop()
+
+
+def measure(mode: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--run", mode], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run)
+        return
+
+    click.echo(f"{'mode':<10}{'startup (ms)':>14}{'RSS (MiB)':>12}")
+    for mode in MODES:
+        results = [measure(mode) for _ in range(args.repeat)]
+        startup = min(r["startup"] for r in results) * 1000
+        rss = min(r["rss"] for r in results) / 1024
+        click.echo(f"{mode:<10}{startup:>14.2f}{rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
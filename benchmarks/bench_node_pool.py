@@ -0,0 +1,80 @@
+"""
+Total heartbeats/sec of node ID pools of the same file, each of which is listened by its own
+process, for the file backends and the SQLite backend.
+
+Each heartbeat is one step of `listen()`, i.e. a node ID is claimed by the first step and
+renewed by the following ones, without sleeping between them.
+
+    python benchmarks/bench_node_pool.py [--workers 1 8 64] [--duration 1.0]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import click
+
+from easyflake.node import (
+    BaseNodeIdPool,
+    FileNodeIdPool,
+    SlotFileNodeIdPool,
+    SqliteNodeIdPool,
+)
+
+BACKENDS = {
+    "file": FileNodeIdPool,
+    "slot": SlotFileNodeIdPool,
+    "sqlite": SqliteNodeIdPool,
+}
+BITS = 10
+
+
+def work(pool_class, endpoint: str, duration: float, start_event, counts, index: int):
+    pool: BaseNodeIdPool = pool_class(endpoint, BITS)
+    listener = pool.listen()
+    start_event.wait()
+    count = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        next(listener)
+        count += 1
+    listener.close()
+    counts[index] = count
+
+
+def measure(backend: str, workers: int, duration: float) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        endpoint = os.path.join(directory, backend)
+        ctx = multiprocessing.get_context("fork")
+        start_event = ctx.Event()
+        counts = ctx.RawArray("Q", workers)
+        processes = [
+            ctx.Process(
+                target=work,
+                args=(BACKENDS[backend], endpoint, duration, start_event, counts, i),
+            )
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        start_event.set()
+        for process in processes:
+            process.join()
+        return sum(counts) / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--duration", type=float, default=1.0)
+    args = parser.parse_args()
+
+    click.echo(f"{'workers':<10}" + "".join(f"{backend:>14}" for backend in BACKENDS))
+    for workers in args.workers:
+        results = [measure(backend, workers, args.duration) for backend in BACKENDS]
+        click.echo(f"{workers:<10}" + "".join(f"{result:>14,.0f}" for result in results))
+
+
+if __name__ == "__main__":
+    main()
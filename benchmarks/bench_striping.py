@@ -0,0 +1,64 @@
+"""
+Total IDs/sec of processes forked from one `EasyFlake`, with the sequence shared by a lock
+(`LocalSequenceState`) and split into per-process lanes (`StripedSequenceState`).
+
+The sequence is kept large so that the throughput is dominated by the lock, not by waiting
+for the next tick.
+
+    python benchmarks/bench_striping.py [--workers 1 2 4 8] [--duration 1.0]
+"""
+import argparse
+import multiprocessing
+import time
+
+import click
+
+from easyflake import EasyFlake, StripedSequenceState
+
+LANE_BITS = 4
+
+
+def work(ef: EasyFlake, duration: float, start_event, counts, index: int):
+    start_event.wait()
+    count = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        ef.get_id()
+        count += 1
+    counts[index] = count
+
+
+def measure(striped: bool, workers: int, duration: float) -> float:
+    state = StripedSequenceState(LANE_BITS) if striped else None
+    ef = EasyFlake(node_id=0, node_id_bits=1, sequence_bits=22, state=state)
+
+    ctx = multiprocessing.get_context("fork")
+    start_event = ctx.Event()
+    counts = ctx.RawArray("Q", workers)
+    processes = [
+        ctx.Process(target=work, args=(ef, duration, start_event, counts, i))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    start_event.set()
+    for process in processes:
+        process.join()
+    return sum(counts) / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=1.0)
+    args = parser.parse_args()
+
+    click.echo(f"{'workers':<10}{'locked':>14}{'striped':>14}")
+    for workers in args.workers:
+        locked = measure(False, workers, args.duration)
+        striped = measure(True, workers, args.duration)
+        click.echo(f"{workers:<10}{locked:>14,.0f}{striped:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
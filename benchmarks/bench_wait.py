@@ -0,0 +1,56 @@
+"""
+Effective IDs/sec of each wait strategy at each time scale.
+
+The sequence is kept small so that it is exhausted on every tick, and the throughput
+is dominated by waiting for the next tick.
+
+    python benchmarks/bench_wait.py [--sequence-bits 2] [--duration 1.0]
+"""
+import argparse
+import time
+
+import click
+
+from easyflake import EasyFlake, HybridWait, SleepWait, SpinWait, TimeScale
+
+STRATEGIES = {
+    "sleep": SleepWait,
+    "spin": SpinWait,
+    "hybrid": HybridWait,
+}
+
+
+def measure(time_scale: int, strategy: str, sequence_bits: int, duration: float) -> float:
+    ef = EasyFlake(
+        node_id=0,
+        node_id_bits=1,
+        sequence_bits=sequence_bits,
+        time_scale=time_scale,
+        wait_strategy=STRATEGIES[strategy](),
+    )
+    count = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        ef.get_id()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sequence-bits", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=1.0)
+    args = parser.parse_args()
+
+    ideal_per_tick = 1 << args.sequence_bits
+    click.echo(f"{'scale':<8}{'strategy':<10}{'IDs/sec':>14}{'ideal':>14}")
+    for scale in TimeScale:
+        ideal = ideal_per_tick * 10**scale
+        for strategy in STRATEGIES:
+            ids_per_sec = measure(scale, strategy, args.sequence_bits, args.duration)
+            click.echo(f"{scale.name:<8}{strategy:<10}{ids_per_sec:>14,.0f}{ideal:>14,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,33 @@
 from importlib import metadata
 
-from easyflake.clock import TimeScale
-from easyflake.easyflake import EasyFlake
+from easyflake.clock import (
+    CoarseClock,
+    MonotonicClock,
+    ScaledClock,
+    SimulatedClock,
+    TimeScale,
+)
+from easyflake.easyflake import DecodedId, EasyFlake
+from easyflake.prefetch import PrefetchingEasyFlake
+from easyflake.sequence import RollbackPolicy
+from easyflake.state import NamedSequenceState, StripedSequenceState
+from easyflake.wait import HybridWait, SleepWait, SpinWait
 
 __all__ = [
     "__version__",
+    "CoarseClock",
+    "DecodedId",
     "EasyFlake",
+    "HybridWait",
+    "MonotonicClock",
+    "NamedSequenceState",
+    "PrefetchingEasyFlake",
+    "RollbackPolicy",
+    "ScaledClock",
+    "SimulatedClock",
+    "SleepWait",
+    "SpinWait",
+    "StripedSequenceState",
     "TimeScale",
 ]
 
@@ -1,6 +1,12 @@
+import abc
+import asyncio
+import os
+import threading
 import time
+import weakref
 from datetime import timedelta
 from enum import IntEnum
+from typing import Union
 
 
 class TimeScale(IntEnum):
@@ -9,27 +15,259 @@ class TimeScale(IntEnum):
     MICRO = 6
 
 
-class ScaledClock:
-    def __init__(self, scale: int, epoch: float):
+# number of decimal places, or the duration of a tick
+TickDuration = Union[int, timedelta]
+
+
+def _validate_scale(scale: int):
+    if not TimeScale.SECOND <= scale <= TimeScale.MICRO:
+        raise ValueError(f"Please set a scale between {TimeScale.SECOND} and {TimeScale.MICRO}.")
+
+
+def to_tick_ns(scale: TickDuration) -> int:
+    """
+    Get the duration of a tick in nanoseconds.
+
+    Args:
+        scale (int, timedelta): The number of decimal places of a second (`TimeScale`),
+                                or any duration of a tick, e.g. 10 milliseconds.
+    """
+    if isinstance(scale, timedelta):
+        tick_ns = scale // timedelta(microseconds=1) * 1000
+        if tick_ns <= 0:
+            raise ValueError(f"Please set a tick of 1 microsecond or longer, but {scale} is given.")
+        return tick_ns
+    _validate_scale(scale)
+    return 10 ** (9 - scale)
+
+
+def _to_epoch_ns(epoch: float) -> int:
+    return round(epoch * 1_000_000) * 1000
+
+
+class BaseClock(abc.ABC):
+    """
+    Interface of the clocks used by `TimeSequenceProvider`.
+    A clock counts ticks from the epoch.
+
+    Attributes:
+        tick_ns (int): The duration of a tick in nanoseconds.
+        epoch (int): The epoch in ticks since the Unix epoch.
+    """
+
+    tick_ns: int
+    epoch: int
+
+    @abc.abstractmethod
+    def __init__(self, scale: TickDuration, epoch: float):
+        """
+        Create a clock with ticks of `scale` counted from `epoch` (seconds since the Unix epoch).
+        `TimeSequenceProvider` creates a clock class with this signature.
+        """
+
+    @abc.abstractmethod
+    def current(self) -> int:
+        """Get the current tick."""
+
+    @abc.abstractmethod
+    def future(self, delta: timedelta) -> int:
+        """Get the tick after `delta` from now."""
+
+    @abc.abstractmethod
+    def sleep(self, current: int, future: int):
+        """Sleep from the tick `current` until the tick `future`."""
+
+    @property
+    def lag_ticks(self) -> int:
+        """
+        The number of ticks `current` may lag behind the time, so that a timestamp written by
+        another process using the same clock may be ahead of it without a rollback.
+        """
+        return 0
+
+    def spin(self, future: int):
+        """Busy-wait until the tick `future`, yielding to other threads."""
+        while self.current() < future:
+            time.sleep(0)
+
+    async def asleep(self, current: int, future: int):
+        """Sleep from the tick `current` until the tick `future` without blocking event loop."""
+        await asyncio.sleep(max(future - current, 0) * self.tick_ns / 1_000_000_000)
+
+    def to_unix_ns(self, tick: int) -> int:
+        """Convert a tick to nanoseconds since the Unix epoch."""
+        return (tick + self.epoch) * self.tick_ns
+
+    def from_unix_ns(self, unix_ns: int) -> int:
+        """Convert nanoseconds since the Unix epoch to the tick containing it."""
+        return unix_ns // self.tick_ns - self.epoch
+
+
+class ScaledClock(BaseClock):
+    def __init__(self, scale: TickDuration, epoch: float):
         """
         A clock that counts up with a certain scale factor.
 
         Args:
-            scale (int): The scale factor for the clock. Must be between 0 and 6.
+            scale (int, timedelta): The scale factor for the clock. Must be between 0 and 6.
+                                    A tick duration (timedelta) is counted by integer
+                                    nanoseconds of `time.time_ns()` instead.
             epoch (float): The epoch timestamp.
         """
-        if not TimeScale.SECOND <= scale <= TimeScale.MICRO:
-            raise ValueError(
-                f"Please set a scale between {TimeScale.SECOND} and {TimeScale.MICRO}."
-            )
-        self.scale_factor = 10**scale
-        self.epoch = int(epoch * self.scale_factor)
+        self.tick_ns = to_tick_ns(scale)
+        if isinstance(scale, timedelta):
+            self.scale_factor = None
+            self.epoch = _to_epoch_ns(epoch) // self.tick_ns
+        else:
+            self.scale_factor = 10**scale
+            self.epoch = int(epoch * self.scale_factor)
 
     def current(self) -> int:
+        if self.scale_factor is None:
+            return time.time_ns() // self.tick_ns - self.epoch
         return int(time.time() * self.scale_factor) - self.epoch
 
     def future(self, delta: timedelta) -> int:
-        return self.current() + int(delta.total_seconds() * self.scale_factor)
+        return self.current() + (delta // timedelta(microseconds=1)) * 1000 // self.tick_ns
+
+    def sleep(self, current: int, future: int):
+        time.sleep(max(future - current, 0) * self.tick_ns / 1_000_000_000)
+
+
+class MonotonicClock(BaseClock):
+    def __init__(self, scale: TickDuration, epoch: float):
+        """
+        A clock that counts up with a certain scale factor using integer nanoseconds.
+
+        The clock is anchored to the wall clock once when it is created, and then follows
+        `time.monotonic_ns()`, so it is not affected by steps of the wall clock (e.g. NTP).
+
+        Args:
+            scale (int, timedelta): The scale factor for the clock. Must be between 0 and 6.
+                                    Or the duration of a tick.
+            epoch (float): The epoch timestamp.
+        """
+        self.tick_ns = to_tick_ns(scale)
+
+        self.epoch = _to_epoch_ns(epoch) // self.tick_ns
+        # offset from the monotonic clock to the Unix epoch, so that ticks are aligned with
+        # `to_unix_ns` even if the epoch is not a multiple of a tick
+        self._offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def current(self) -> int:
+        return (time.monotonic_ns() + self._offset_ns) // self.tick_ns - self.epoch
+
+    def future(self, delta: timedelta) -> int:
+        return self.current() + (delta // timedelta(microseconds=1)) * 1000 // self.tick_ns
+
+    def sleep(self, current: int, future: int):
+        time.sleep(max(future - current, 0) * self.tick_ns / 1_000_000_000)
+
+
+class CoarseClock(MonotonicClock):
+    _instances: "weakref.WeakSet[CoarseClock]" = weakref.WeakSet()
+
+    def __init__(self, scale: TickDuration, epoch: float, *, interval: float = 0.001):
+        """
+        A clock whose current tick is refreshed by a background thread, so reading it does not
+        call the system clock. The tick lags behind `MonotonicClock` by up to `interval`.
+
+        Args:
+            scale (int, timedelta): The scale factor for the clock. Must be between 0 and 6.
+                                    Or the duration of a tick.
+            epoch (float): The epoch timestamp.
+            interval (float): The refresh interval in seconds.
+                              It should not be longer than a tick.
+        """
+        super().__init__(scale, epoch)
+        self.interval = interval
+        self._current = super().current()
+        # the tick is written by the refresh thread and by waiting threads
+        self._write_lock = threading.Lock()
+        self._start()
+        CoarseClock._instances.add(self)
+
+    def _start(self):
+        thread = threading.Thread(target=self._refresh, args=(weakref.ref(self),), daemon=True)
+        thread.start()
+
+    @staticmethod
+    def _refresh(ref: "weakref.ReferenceType[CoarseClock]"):
+        # hold only a weak reference so the thread ends with the clock
+        while (clock := ref()) is not None:
+            clock._advance(MonotonicClock.current(clock))
+            interval = clock.interval
+            del clock
+            time.sleep(interval)
+
+    def current(self) -> int:
+        return self._current
+
+    @property
+    def lag_ticks(self) -> int:
+        # the refresh thread of each process may be behind by `interval`
+        return -(-round(self.interval * 1_000_000_000) // self.tick_ns)
+
+    def _advance(self, tick: int):
+        # a reading older than the tick written by another thread must not move it backwards
+        with self._write_lock:
+            if tick > self._current:
+                self._current = tick
+
+    def sleep(self, current: int, future: int):
+        super().sleep(current, future)
+        self._advance(MonotonicClock.current(self))
+
+    def spin(self, future: int):
+        # the refreshed tick may be late by `interval`, so refer to the monotonic clock
+        while (current := MonotonicClock.current(self)) < future:
+            time.sleep(0)
+        self._advance(current)
+
+    @classmethod
+    def _restart_all(cls):
+        # threads do not survive fork, and the lock may be held by one of them
+        for clock in list(cls._instances):
+            clock._write_lock = threading.Lock()
+            clock._start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=CoarseClock._restart_all)
+
+
+class SimulatedClock(BaseClock):
+    def __init__(self, scale: TickDuration, epoch: float, *, start: int = 0):
+        """
+        A virtual clock that never really sleeps. `sleep` advances the clock instead, and
+        the clock can also be moved by `advance` (e.g. backwards to simulate a rollback).
+
+        Args:
+            scale (int, timedelta): The scale factor for the clock. Must be between 0 and 6.
+                                    Or the duration of a tick.
+            epoch (float): The epoch timestamp.
+            start (int): The initial tick.
+        """
+        self.tick_ns = to_tick_ns(scale)
+        self.epoch = _to_epoch_ns(epoch) // self.tick_ns
+        self._current = start
+
+    def current(self) -> int:
+        return self._current
+
+    def future(self, delta: timedelta) -> int:
+        return self._current + (delta // timedelta(microseconds=1)) * 1000 // self.tick_ns
 
     def sleep(self, current: int, future: int):
-        time.sleep((future - current) / self.scale_factor)
+        self._current = max(self._current, future)
+
+    def spin(self, future: int):
+        self._current = max(self._current, future)
+
+    async def asleep(self, current: int, future: int):
+        self.sleep(current, future)
+        await asyncio.sleep(0)
+
+    def advance(self, ticks: int):
+        """Move the clock by `ticks`, which may be negative."""
+        self._current += ticks
@@ -1,16 +1,47 @@
-from datetime import timedelta
-from typing import Union
+import os
+import time
+import uuid
+import weakref
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
-from easyflake.clock import TimeScale
+from easyflake.clock import TickDuration, TimeScale
+from easyflake.encoding import Base32Codec, Base62Codec, BytesCodec
 from easyflake.logging import warning
 from easyflake.node import BaseNodeIdPool
-from easyflake.sequence import TimeSequenceProvider
+from easyflake.node.base import INVALID_VALUE, ForkPolicy
+from easyflake.sequence import TimeSequenceProvider, TimeSequenceRange
+from easyflake.utils.optional import import_numpy
+
+if TYPE_CHECKING:
+    import numpy
 
 DEFAULT_EPOCH_TIMESTAMP = 1675859040
 
+# bits of UUIDv7 except the unix_ts_ms, ver and var fields
+UUID7_PAYLOAD_BITS = 74
+# bits of rand_b field in UUIDv7
+UUID7_RAND_B_BITS = 62
+
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_unix_ns(dt: datetime) -> int:
+    return (dt.astimezone(timezone.utc) - UNIX_EPOCH) // timedelta(microseconds=1) * 1000
+
+
+@dataclass(frozen=True)
+class DecodedId:
+    timestamp: datetime
+    node_id: int
+    sequence: int
+
 
 class EasyFlake:
-    _max_bits = 64
+    _renewed_at_fork: "weakref.WeakSet[EasyFlake]" = weakref.WeakSet()
 
     def __init__(
         self,
@@ -18,11 +49,13 @@ class EasyFlake:
         node_id_bits: int = 8,
         sequence_bits: int = 8,
         epoch: float = DEFAULT_EPOCH_TIMESTAMP,
-        time_scale: int = TimeScale.MILLI,
+        time_scale: TickDuration = TimeScale.MILLI,
+        id_bits: int = 64,
+        start_node_id_pool: bool = True,
         **kwargs,
     ):
         """
-        Class for generating 64-bit IDs similar to Snowflake or Sonyflake.
+        Class for generating 64-bit (or wider) IDs similar to Snowflake or Sonyflake.
 
         Args:
             node_id (int, NodeIdPool): node ID (or generator) of execution environment.
@@ -31,15 +64,28 @@ class EasyFlake:
             epoch (float): Timestamp that is used as a reference when generating bits of timestamp
                            section.
                            Defaults to 2023-02-08T12:24:00Z.
-            time_scale (int): number of decimal places in timestamp.
+            time_scale (int, timedelta): number of decimal places in timestamp, or any
+                                         duration of a tick, e.g. `timedelta(milliseconds=10)`.
+            id_bits (int): maximum number of bits in ID, e.g. 96 or 128 for wide layouts
+                           with more node ID and sequence bits.
+            start_node_id_pool (bool): start acquiring the node ID from the pool in the
+                                       background when created. Otherwise, it is acquired
+                                       when the first ID is generated. In both cases,
+                                       the constructor does not wait for the node ID.
         """
+        self._max_bits = id_bits
         self._node_id_bits = node_id_bits
         self._sequence_bits = sequence_bits
+        self._timestamp_shift = sequence_bits + node_id_bits
 
+        # (pool generation, node ID, node ID shifted to its position in ID, lease expiry)
+        self._node_id_cache: Tuple[Optional[int], int, int, float]
         if isinstance(node_id, BaseNodeIdPool):
-            self._node_id_provider = node_id.get
+            self._node_id_pool: Optional[BaseNodeIdPool] = node_id
+            self._node_id_cache = (None, INVALID_VALUE, 0, 0.0)
         else:
-            self._node_id_provider = lambda: node_id  # type: ignore
+            self._node_id_pool = None
+            self._node_id_cache = (None, node_id, node_id << sequence_bits, float("inf"))
 
         self._sequence_provider = TimeSequenceProvider(
             bits=sequence_bits,
@@ -49,21 +95,291 @@ class EasyFlake:
         )
         self._validate()
 
+        if self._node_id_pool is not None and start_node_id_pool:
+            self._node_id_pool.start()
+        if self._node_id_pool is not None and self._node_id_pool.on_fork == ForkPolicy.RENEW:
+            EasyFlake._renewed_at_fork.add(self)
+
+    def _after_fork(self):
+        # the child acquires a new node ID, so it does not share the sequence with the parent
+        self._node_id_cache = (None, INVALID_VALUE, 0, 0.0)
+        self._sequence_provider._renew_state()
+
+    @classmethod
+    def _after_fork_all(cls):
+        for ef in list(cls._renewed_at_fork):
+            ef._after_fork()
+
+    @property
+    def is_wide(self) -> bool:
+        """whether IDs are wider than 64 bits."""
+        return self._max_bits > 64
+
+    @property
+    def node_id(self) -> int:
+        return self._get_node_id_cache()[1]
+
     @property
-    def node_id(self):
-        return self._node_id_provider()
+    def lead(self) -> int:
+        """number of ticks the timestamp is ahead of the clock by borrow-ahead."""
+        return self._sequence_provider.lead
+
+    @property
+    def rollback_count(self) -> int:
+        """number of clock rollbacks detected in this process."""
+        return self._sequence_provider.rollback_count
+
+    @cached_property
+    def base32(self) -> Base32Codec:
+        """Crockford's base32 codec of IDs, which sorts in the same order as IDs."""
+        return Base32Codec(self._max_bits)
+
+    @cached_property
+    def base62(self) -> Base62Codec:
+        """base62 codec of IDs, which sorts in the same order as IDs."""
+        return Base62Codec(self._max_bits)
+
+    @cached_property
+    def binary(self) -> BytesCodec:
+        """fixed-width big-endian bytes codec of IDs, which sorts in the same order as IDs."""
+        return BytesCodec(self._max_bits)
+
+    def _get_node_id_cache(self):
+        """
+        Get the cached node ID. The pool is asked again only when its generation is changed,
+        i.e. the node ID is reassigned or lost, or the lease of the cached node ID has expired.
+        """
+        cache = self._node_id_cache
+        pool = self._node_id_pool
+        if pool is not None and (pool.generation != cache[0] or cache[3] <= time.monotonic()):
+            cache = self._refresh_node_id_cache(pool)
+        return cache
+
+    def _refresh_node_id_cache(self, pool: BaseNodeIdPool):
+        generation = pool.generation
+        node_id = pool.get()
+        return self._store_node_id_cache(generation, node_id, pool.lease_expiry)
+
+    async def _aget_node_id_cache(self):
+        cache = self._node_id_cache
+        pool = self._node_id_pool
+        if pool is not None and (pool.generation != cache[0] or cache[3] <= time.monotonic()):
+            generation = pool.generation
+            node_id = await pool.aget()
+            cache = self._store_node_id_cache(generation, node_id, pool.lease_expiry)
+        return cache
+
+    def _store_node_id_cache(self, generation: int, node_id: int, expires_at: float):
+        self._check_node_id(node_id)
+        cache = (generation, node_id, node_id << self._sequence_bits, expires_at)
+        self._node_id_cache = cache
+        return cache
 
     def get_id(self):
         """generate next ID by current timestamp"""
-        seq = self._sequence_provider.next()
-        return (
-            (seq.timestamp << (self._sequence_bits + self._node_id_bits))
-            | (self.node_id << self._sequence_bits)
-            | seq.value
+        # the hot path: no object is created except the ID
+        timestamp, seq = self._sequence_provider.next_raw()
+        cache = self._node_id_cache
+        pool = self._node_id_pool
+        if pool is not None and (pool.generation != cache[0] or cache[3] <= time.monotonic()):
+            cache = self._refresh_node_id_cache(pool)
+        return (timestamp << self._timestamp_shift) | cache[2] | seq
+
+    def get_ids(self, n: int, *, as_array: bool = False) -> Union[List[int], "array[int]"]:
+        """
+        generate `n` IDs at once.
+        The IDs are the same as calling `get_id` n times, but the sequence is reserved only once.
+
+        Args:
+            n (int): number of IDs.
+            as_array (bool): return `array('Q')` instead of list. Only for 64-bit IDs.
+        """
+        if as_array:
+            self._check_narrow("as_array")
+        node_id_part = self._get_node_id_cache()[2]
+        ranges = self._sequence_provider.reserve(n)
+        return self._build_ids(ranges, node_id_part, as_array)
+
+    def get_ids_array(self, n: int) -> "numpy.ndarray":
+        """
+        generate `n` IDs at once as `numpy.ndarray` of uint64. NumPy is required.
+        The IDs are the same as `get_ids`, but they are built by vectorized operations.
+
+        Args:
+            n (int): number of IDs.
+        """
+        self._check_narrow("get_ids_array")
+        np = import_numpy()
+
+        node_id_part = self._get_node_id_cache()[2]
+        ranges = self._sequence_provider.reserve(n)
+
+        timestamps = np.array([seq.timestamp for seq in ranges], dtype=np.uint64)
+        counts = np.array([len(seq) for seq in ranges], dtype=np.int64)
+        # offset of the sequence from the position in the result
+        offsets = np.cumsum(counts) - counts - np.array([seq.start for seq in ranges])
+
+        sequences = np.arange(n, dtype=np.int64) - np.repeat(offsets, counts)
+        ids = np.repeat(timestamps, counts) << np.uint64(self._timestamp_shift)
+        ids |= np.uint64(node_id_part)
+        ids |= sequences.astype(np.uint64)
+        return ids
+
+    def _build_ids(
+        self, ranges: List[TimeSequenceRange], node_id_part: int, as_array: bool
+    ) -> Union[List[int], "array[int]"]:
+        ids: Union[List[int], "array[int]"] = array("Q") if as_array else []
+        for seq in ranges:
+            base = (seq.timestamp << self._timestamp_shift) | node_id_part
+            ids.extend(range(base + seq.start, base + seq.stop))
+        return ids
+
+    async def aget_id(self) -> int:
+        """
+        generate next ID by current timestamp without blocking the event loop.
+        The next tick and the node ID are awaited instead of blocking.
+        """
+        timestamp, seq = await self._sequence_provider.anext_raw()
+        cache = await self._aget_node_id_cache()
+        return (timestamp << self._timestamp_shift) | cache[2] | seq
+
+    async def aget_ids(self, n: int, *, as_array: bool = False) -> Union[List[int], "array[int]"]:
+        """
+        Same as `get_ids`, but without blocking the event loop.
+        """
+        if as_array:
+            self._check_narrow("as_array")
+        node_id_part = (await self._aget_node_id_cache())[2]
+        ranges = await self._sequence_provider.areserve(n)
+        return self._build_ids(ranges, node_id_part, as_array)
+
+    def get_uuid(self) -> uuid.UUID:
+        """
+        generate next ID as UUIDv7 (RFC 9562), which sorts in the same order as IDs.
+        The sub-millisecond part of the timestamp, node ID and sequence are stored in the
+        rand_a and rand_b fields. Use `.bytes` of the result for the binary form.
+        """
+        # validated before a sequence value is consumed
+        sub_ms_bits = self._uuid_sub_ms_bits
+        timestamp, seq = self._sequence_provider.next_raw()
+        node_id_part = self._get_node_id_cache()[2]
+        return self._to_uuid(timestamp, node_id_part | seq, sub_ms_bits)
+
+    def get_uuids(self, n: int) -> List[uuid.UUID]:
+        """
+        generate `n` IDs at once as UUIDv7. See `get_uuid`.
+
+        Args:
+            n (int): number of IDs.
+        """
+        sub_ms_bits = self._uuid_sub_ms_bits
+        node_id_part = self._get_node_id_cache()[2]
+        return [
+            self._to_uuid(seq.timestamp, node_id_part | value, sub_ms_bits)
+            for seq in self._sequence_provider.reserve(n)
+            for value in range(seq.start, seq.stop)
+        ]
+
+    @cached_property
+    def _uuid_sub_ms_bits(self) -> int:
+        """number of bits for the ticks within a millisecond in UUIDv7."""
+        tick_ns = self._sequence_provider.clock.tick_ns
+        sub_ms_bits = ((1_000_000 - 1) // tick_ns).bit_length() if tick_ns < 1_000_000 else 0
+        bits = sub_ms_bits + self._timestamp_shift
+        if bits > UUID7_PAYLOAD_BITS:
+            raise ValueError(
+                f"UUIDv7 has {UUID7_PAYLOAD_BITS} bits for the sub-millisecond timestamp, "
+                f"node ID and sequence, but {bits} bits are required."
+            )
+        return sub_ms_bits
+
+    def _to_uuid(self, timestamp: int, lower: int, sub_ms_bits: int) -> uuid.UUID:
+        clock = self._sequence_provider.clock
+        unix_ms, sub_ns = divmod(clock.to_unix_ns(timestamp), 1_000_000)
+        sub_ms = sub_ns // clock.tick_ns if sub_ms_bits else 0
+        payload = (sub_ms << self._timestamp_shift) | lower
+        return uuid.UUID(
+            int=(unix_ms << 80)
+            | (0x7 << 76)
+            | ((payload >> UUID7_RAND_B_BITS) << 64)
+            | (0b10 << UUID7_RAND_B_BITS)
+            | (payload & ((1 << UUID7_RAND_B_BITS) - 1))
         )
 
+    def decode(self, flake_id: int) -> DecodedId:
+        """
+        decode an ID into the timestamp, node ID and sequence by the layout of this generator.
+        """
+        sequence = flake_id & ((1 << self._sequence_bits) - 1)
+        node_id = (flake_id >> self._sequence_bits) & ((1 << self._node_id_bits) - 1)
+        unix_ns = self._sequence_provider.clock.to_unix_ns(flake_id >> self._timestamp_shift)
+        timestamp = UNIX_EPOCH + timedelta(microseconds=unix_ns // 1000)
+        return DecodedId(timestamp=timestamp, node_id=node_id, sequence=sequence)
+
+    def decode_many(
+        self, flake_ids: Iterable[int], *, as_datetime: bool = True
+    ) -> Dict[str, "numpy.ndarray"]:
+        """
+        decode IDs into columns of "timestamp", "node_id" and "sequence" by vectorized masks.
+        NumPy is required.
+
+        Args:
+            flake_ids (iterable, numpy.ndarray): IDs to decode.
+            as_datetime (bool): the timestamps are `datetime64[ns]` if True,
+                                otherwise nanoseconds since the Unix epoch.
+        """
+        self._check_narrow("decode_many")
+        np = import_numpy()
+
+        if not hasattr(flake_ids, "__len__"):
+            flake_ids = list(flake_ids)
+        ids = np.asarray(flake_ids, dtype=np.uint64)
+        clock = self._sequence_provider.clock
+
+        sequence = ids & np.uint64((1 << self._sequence_bits) - 1)
+        node_id = (ids >> np.uint64(self._sequence_bits)) & np.uint64((1 << self._node_id_bits) - 1)
+        ticks = (ids >> np.uint64(self._timestamp_shift)).astype(np.int64)
+        timestamp = (ticks + clock.epoch) * clock.tick_ns
+        if as_datetime:
+            timestamp = timestamp.astype("datetime64[ns]")
+
+        return {
+            "timestamp": timestamp,
+            "node_id": node_id.astype(np.int64),
+            "sequence": sequence.astype(np.int64),
+        }
+
+    def id_range(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """
+        Get the minimum and maximum IDs that can be generated between `start` and `end`
+        (inclusive), e.g. for `WHERE id BETWEEN min AND max`. The maximum includes the ticks
+        borrowed ahead of `end` by `borrow_ticks`.
+        Naive datetimes are treated as local time.
+        """
+        start_ns, end_ns = _to_unix_ns(start), _to_unix_ns(end)
+        if end_ns < start_ns:
+            raise ValueError(f"end is required to be >=start, but {start} and {end} are given.")
+
+        clock = self._sequence_provider.clock
+        start_tick = max(clock.from_unix_ns(start_ns), 0)
+        end_tick = clock.from_unix_ns(end_ns) + self._sequence_provider.borrow_ticks
+        if end_tick < 0:
+            raise ValueError(f"end is required to be after the epoch, but {end} is given.")
+        return start_tick << self._timestamp_shift, ((end_tick + 1) << self._timestamp_shift) - 1
+
+    def id_ranges(self, windows: Sequence[Tuple[datetime, datetime]]) -> List[Tuple[int, int]]:
+        """
+        Same as `id_range` for each window of (start, end).
+        """
+        return [self.id_range(start, end) for start, end in windows]
+
+    def _check_narrow(self, name: str):
+        if self.is_wide:
+            raise ValueError(f"{name} supports only 64-bit IDs, but id_bits is {self._max_bits}.")
+
     def _validate(self):
         """validate attributes."""
+        self._validate_id_bits()
         self._validate_sequence_bits()
         self._validate_node_id()
         self._validate_id_length()
@@ -72,11 +388,28 @@ class EasyFlake:
         if self._node_id_bits < 1:
             raise ValueError("node_id_bits is required to be >0")  # pragma: nocover
 
+        pool = self._node_id_pool
+        if pool is None:
+            self._check_node_id(self.node_id)
+        elif pool.bits > self._node_id_bits:
+            # the node ID itself is checked when it is acquired
+            raise ValueError(
+                f"node_id_bits is required to be >=bits of the pool, "
+                f"but {self._node_id_bits} and {pool.bits} are given."
+            )
+
+    def _check_node_id(self, node_id: int):
         max_node_id = (1 << self._node_id_bits) - 1
-        if not 0 <= self.node_id <= max_node_id:
+        if not 0 <= node_id <= max_node_id:
+            raise ValueError(
+                f"node_id is required to be >=0 and <={max_node_id}, but {node_id} is given."
+            )
+
+    def _validate_id_bits(self):
+        if self._max_bits < 64 or self._max_bits % 8:
             raise ValueError(
-                f"node_id is required to be >=0 and <={max_node_id}, "
-                f"but {self.node_id} is given."
+                f"id_bits is required to be a multiple of 8 and >=64, "
+                f"but {self._max_bits} is given."
             )
 
     def _validate_sequence_bits(self):
@@ -86,7 +419,10 @@ class EasyFlake:
     def _validate_id_length(self):
         # Check sufficient node_id bits
         if not self._has_sufficient_timestamp_bits(years=1):
-            raise ValueError("Unable to count timestamp within a year.")
+            raise ValueError(
+                "Unable to count timestamp within a year. "
+                "Use a longer tick (time_scale) or fewer node ID and sequence bits."
+            )
         if not self._has_sufficient_timestamp_bits(years=3):
             warning("Unable to count timestamp within 3 years.")
 
@@ -95,3 +431,7 @@ class EasyFlake:
         timestamp_bits = self._sequence_provider.get_required_bits(delta)
         bits = timestamp_bits + self._node_id_bits + self._sequence_bits
         return bits < self._max_bits
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=EasyFlake._after_fork_all)
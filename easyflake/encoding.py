@@ -0,0 +1,270 @@
+import abc
+import base64
+import binascii
+import functools
+from typing import Any, Generic, Iterable, List, Optional, TypeVar
+
+from easyflake.utils.optional import import_numpy
+
+__all__ = [
+    "BaseCodec",
+    "Base32Codec",
+    "Base62Codec",
+    "BytesCodec",
+]
+
+T = TypeVar("T")
+
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# batches smaller than this are faster without NumPy
+NUMPY_MIN_BATCH = 16
+
+
+@functools.lru_cache(maxsize=None)
+def _find_numpy() -> Optional[Any]:
+    """NumPy if it is installed, otherwise None."""
+    try:
+        return import_numpy()
+    except ImportError:
+        return None
+
+
+class BaseCodec(abc.ABC, Generic[T]):
+    def __init__(self, bits: int = 64):
+        """
+        Base class of fixed-width, order-preserving encodings of IDs.
+        The encoded values sort in the same order as the integers.
+
+        Args:
+            bits (int): The maximum number of bits of IDs.
+        """
+        self.bits = bits
+
+    def _check(self, value: int):
+        if not 0 <= value < 1 << self.bits:
+            raise ValueError(f"{value} cannot be represented in {self.bits} bits")
+
+    def encode(self, value: int) -> T:
+        return self.encode_many([value])[0]
+
+    def decode(self, encoded: T) -> int:
+        return self.decode_many([encoded])[0]
+
+    @abc.abstractmethod
+    def encode_many(self, values: Iterable[int]) -> List[T]:
+        """Encode IDs."""
+
+    @abc.abstractmethod
+    def decode_many(self, encoded: Iterable[T]) -> List[int]:
+        """Decode encoded IDs."""
+
+
+class Base32Codec(BaseCodec[str]):
+    """
+    Crockford's base32, which is case-insensitive and accepts I, L as 1 and O as 0.
+
+    >>> codec = Base32Codec(64)
+    >>> codec.encode(1234567890)
+    '00000014SC0PJ'
+    >>> codec.decode("000000i4sc0pj")
+    1234567890
+    """
+
+    alphabet = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+    _standard_alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+    _encode_table = str.maketrans(_standard_alphabet, alphabet)
+    # U is not used by Crockford's base32, but it is valid in the standard alphabet
+    _decode_table = str.maketrans(alphabet + "ILOU", _standard_alphabet + "BBA!")
+
+    def __init__(self, bits: int = 64):
+        super().__init__(bits)
+        self.width = -(-bits // 5)
+        # characters and bytes of a block which is encoded without base32 padding
+        self._block_chars = -(-self.width // 8) * 8
+        self._block_bytes = self._block_chars // 8 * 5
+
+    def encode_many(self, values: Iterable[int]) -> List[str]:
+        block_bytes, block_chars = self._block_bytes, self._block_chars
+        blocks = []
+        for value in values:
+            self._check(value)
+            blocks.append(value.to_bytes(block_bytes, "big"))
+
+        # encode all values at once, then cut the leading zeros of each block
+        encoded = base64.b32encode(b"".join(blocks)).decode("ascii")
+        encoded = encoded.translate(self._encode_table)
+        skip = block_chars - self.width
+        return [encoded[i + skip : i + block_chars] for i in range(0, len(encoded), block_chars)]
+
+    def decode_many(self, encoded: Iterable[str]) -> List[int]:
+        block_bytes = self._block_bytes
+        padding = "0" * (self._block_chars - self.width)
+        texts = []
+        for text in encoded:
+            if len(text) != self.width:
+                raise ValueError(f"{text!r} is not {self.width} characters")
+            texts.append(padding + text)
+
+        joined = "".join(texts).upper().translate(self._decode_table)
+        try:
+            data = base64.b32decode(joined)
+        except binascii.Error as e:
+            raise ValueError(f"invalid base32: {e}")
+
+        values = [
+            int.from_bytes(data[i : i + block_bytes], "big")
+            for i in range(0, len(data), block_bytes)
+        ]
+        for value in values:
+            self._check(value)
+        return values
+
+
+class Base62Codec(BaseCodec[str]):
+    """
+    Base62 of 0-9, A-Z and a-z, in the ASCII order.
+
+    >>> codec = Base62Codec(64)
+    >>> codec.encode(1234567890)
+    '000001LY7VK'
+    >>> codec.decode('000001LY7VK')
+    1234567890
+    """
+
+    alphabet = BASE62_ALPHABET
+    # two characters are processed at once
+    _pairs = [a + b for a in BASE62_ALPHABET for b in BASE62_ALPHABET]
+    _pair_values = {pair: i for i, pair in enumerate(_pairs)}
+
+    def __init__(self, bits: int = 64):
+        super().__init__(bits)
+        self.width = 1
+        while 62**self.width < 1 << bits:
+            self.width += 1
+        self._pair_count = -(-self.width // 2)
+
+    def encode_many(self, values: Iterable[int]) -> List[str]:
+        values = list(values)
+        np = _find_numpy() if len(values) >= NUMPY_MIN_BATCH and self.bits <= 64 else None
+        if np is not None:
+            encoded = self._encode_array(np, values)
+            if encoded is not None:
+                return encoded
+        pairs = self._pairs
+        skip = self._pair_count * 2 - self.width
+        result = []
+        for value in values:
+            self._check(value)
+            chunks = []
+            for _ in range(self._pair_count):
+                value, rem = divmod(value, 3844)
+                chunks.append(pairs[rem])
+            result.append("".join(reversed(chunks))[skip:])
+        return result
+
+    def decode_many(self, encoded: Iterable[str]) -> List[int]:
+        encoded = list(encoded)
+        np = _find_numpy() if len(encoded) >= NUMPY_MIN_BATCH and self.bits <= 64 else None
+        if np is not None:
+            decoded = self._decode_array(np, encoded)
+            if decoded is not None:
+                return decoded
+        pair_values = self._pair_values
+        padding = "0" * (self._pair_count * 2 - self.width)
+        result = []
+        for text in encoded:
+            if len(text) != self.width:
+                raise ValueError(f"{text!r} is not {self.width} characters")
+            text = padding + text
+            value = 0
+            try:
+                for i in range(0, len(text), 2):
+                    value = value * 3844 + pair_values[text[i : i + 2]]
+            except KeyError:
+                raise ValueError(f"invalid base62: {text!r}")
+            self._check(value)
+            result.append(value)
+        return result
+
+    def _encode_array(self, np: Any, values: List[int]) -> Optional[List[str]]:
+        """
+        Encode IDs of up to 64 bits by NumPy, a digit of every ID at once.
+        Returns None if any ID is out of range, so that the error is raised by `encode_many`.
+        """
+        try:
+            array = np.array(values, dtype=np.uint64)
+        except (OverflowError, TypeError, ValueError):
+            return None
+        if self.bits < 64 and (array >> np.uint64(self.bits)).any():
+            return None
+
+        digits = np.empty((len(array), self.width), dtype=np.uint8)
+        for i in range(self.width - 1, -1, -1):
+            digits[:, i] = array % np.uint64(62)
+            array //= np.uint64(62)
+        chars = np.frombuffer(self.alphabet.encode(), dtype=np.uint8)[digits]
+        return chars.view(f"S{self.width}").ravel().astype(f"U{self.width}").tolist()
+
+    def _decode_array(self, np: Any, encoded: List[str]) -> Optional[List[int]]:
+        """
+        Decode IDs of up to 64 bits by NumPy, a digit of every ID at once.
+        Returns None if any text is invalid, so that the error is raised by `decode_many`.
+        """
+        width = self.width
+        if any(len(text) != width for text in encoded):
+            return None
+        try:
+            data = "".join(encoded).encode("ascii")
+        except UnicodeEncodeError:
+            return None
+
+        lookup = np.full(256, 255, dtype=np.uint8)
+        lookup[np.frombuffer(self.alphabet.encode(), dtype=np.uint8)] = np.arange(62)
+        digits = lookup[np.frombuffer(data, dtype=np.uint8).reshape(-1, width)]
+        if (digits == 255).any():
+            return None
+
+        # the digits except the last one fit in 64 bits, and the last one is checked for overflow
+        high = np.zeros(len(digits), dtype=np.uint64)
+        for i in range(width - 1):
+            high = high * np.uint64(62) + digits[:, i]
+        last = digits[:, -1].astype(np.uint64)
+        limit_high, limit_last = divmod(1 << self.bits, 62)
+        if (
+            (high > np.uint64(limit_high))
+            | ((high == np.uint64(limit_high)) & (last >= np.uint64(limit_last)))
+        ).any():
+            return None
+        return (high * np.uint64(62) + last).tolist()
+
+
+class BytesCodec(BaseCodec[bytes]):
+    """
+    Fixed-width big-endian bytes.
+
+    >>> codec = BytesCodec(64)
+    >>> codec.encode(1234567890)
+    b'\\x00\\x00\\x00\\x00I\\x96\\x02\\xd2'
+    >>> codec.decode(b'\\x00\\x00\\x00\\x00I\\x96\\x02\\xd2')
+    1234567890
+    """
+
+    def __init__(self, bits: int = 64):
+        super().__init__(bits)
+        self.width = -(-bits // 8)
+
+    def encode_many(self, values: Iterable[int]) -> List[bytes]:
+        result = []
+        for value in values:
+            self._check(value)
+            result.append(value.to_bytes(self.width, "big"))
+        return result
+
+    def decode_many(self, encoded: Iterable[bytes]) -> List[int]:
+        result = []
+        for data in encoded:
+            if len(data) != self.width:
+                raise ValueError(f"{data!r} is not {self.width} bytes")
+            result.append(int.from_bytes(data, "big"))
+        return result
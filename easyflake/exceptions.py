@@ -3,3 +3,16 @@ class SequenceOverflowError(Exception):
         self.bits = bits
         max_val = (1 << bits) - 1
         super().__init__("The sequence has reached the maximum value of %s.", max_val)
+
+
+class ClockRollbackError(Exception):
+    def __init__(self, ticks: int):
+        self.ticks = ticks
+        super().__init__("The clock has moved backwards by %s ticks.", ticks)
+
+
+class LeaseExpiredError(TimeoutError):
+    def __init__(self, node_id: int):
+        self.node_id = node_id
+        # formatted, as `OSError` takes two arguments as errno and strerror
+        super().__init__(f"The lease of node ID {node_id} has expired.")
@@ -1,9 +1,19 @@
+from easyflake.node.base import ForkPolicy, Lease, ListenerMode
 from easyflake.node.base import NodeIdPool as BaseNodeIdPool
 from easyflake.node.file import NodeIdPool as FileNodeIdPool
 from easyflake.node.grpc import NodeIdPool as GrpcNodeIdPool
+from easyflake.node.redis import NodeIdPool as RedisNodeIdPool
+from easyflake.node.slot import NodeIdPool as SlotFileNodeIdPool
+from easyflake.node.sqlite import NodeIdPool as SqliteNodeIdPool
 
 __all__ = [
     "BaseNodeIdPool",
+    "ForkPolicy",
     "FileNodeIdPool",
     "GrpcNodeIdPool",
+    "Lease",
+    "ListenerMode",
+    "RedisNodeIdPool",
+    "SlotFileNodeIdPool",
+    "SqliteNodeIdPool",
 ]
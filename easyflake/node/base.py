@@ -1,80 +1,257 @@
 import abc
+import asyncio
+import ctypes
 import multiprocessing
+import os
 import random
+import threading
 import time
+import weakref
+from dataclasses import dataclass
+from enum import Enum
 from multiprocessing.sharedctypes import Synchronized
-from typing import TYPE_CHECKING, Iterator, Optional
+from typing import TYPE_CHECKING, Any, Generator, Optional, Union
 
 from easyflake import logging
+from easyflake.exceptions import LeaseExpiredError
 from easyflake.utils.singleton import SingletonABCMeta
 
 TIMEOUT = 5
 INVALID_VALUE = -255
+# interval to check whether an expired lease is renewed
+LEASE_POLL_INTERVAL = 0.01
+
+
+@dataclass(frozen=True)
+class Lease:
+    """
+    A node ID assigned until `expires_at` (`time.monotonic()`), after which another node may
+    be given the same node ID.
+    """
+
+    node_id: int
+    expires_at: float
+
+
+class ForkPolicy(str, Enum):
+    """How a `NodeIdPool` behaves in a child process after fork."""
+
+    # keep using the node ID of the parent, and leave the listener to the parent
+    SHARE = "share"
+    # acquire a new node ID by a listener of the child
+    RENEW = "renew"
+
+
+class ListenerMode(str, Enum):
+    """Where `NodeIdPool.listen` runs."""
+
+    # a daemon subprocess, which can be shared with the processes forked from the parent
+    PROCESS = "process"
+    # a daemon thread of this process
+    THREAD = "thread"
+    # a task of the running event loop, whose `listen` steps run in the default executor
+    ASYNCIO = "asyncio"
+
+
+# the end of `listen` in the asyncio listener
+_END = object()
 
 
 class NodeIdPool(metaclass=SingletonABCMeta):
-    def __init__(self, endpoint: str, bits: int, *, timeout: int = TIMEOUT):
+    _instances: "weakref.WeakSet[NodeIdPool]" = weakref.WeakSet()
+    _forking_listener = False
+    on_fork: Optional[ForkPolicy] = None
+
+    def __init__(
+        self,
+        endpoint: str,
+        bits: int,
+        *,
+        timeout: float = TIMEOUT,
+        on_fork: Union[ForkPolicy, str, None] = None,
+        listener: Union[ListenerMode, str] = ListenerMode.PROCESS,
+    ):
         """
         Base class for each NodeIdPool.
         This class provides a `get` method to allocated node ID.
 
         Subclasses should implement the `listen` method.
+
+        `on_fork` is the behavior in child processes after fork (e.g. prefork servers with
+        preload). Nothing is done after fork if it is None.
+
+        `listener` is where `listen` runs. With a thread or an asyncio task, no process is
+        spawned, and the node ID is a plain attribute instead of shared memory.
+        An asyncio listener is started by `aget` (or by `get` in the event loop thread, once
+        the node ID is acquired by `aget`).
         """
         self.bits = bits
         self.endpoint = endpoint
         self.timeout = timeout
+        self.on_fork = None if on_fork is None else ForkPolicy(on_fork)
+        self.listener = ListenerMode(listener)
+        if self.on_fork == ForkPolicy.SHARE and self.listener != ListenerMode.PROCESS:
+            raise ValueError(f'on_fork="share" requires listener="process", not {listener!r}.')
+
+        self._init_shared()
+        if self.on_fork is not None:
+            NodeIdPool._instances.add(self)
 
-        # Shared objects
-        self._subprocess: Optional[multiprocessing.Process] = None
-        self._lock = multiprocessing.Lock()
-        self._running_event = multiprocessing.Event()
-        self._value_event = multiprocessing.Event()
+    def _init_shared(self, generation: int = 0):
+        # the subprocess, thread or task running `listen`
+        self._listener: Any = None
+        # whether the listener is started by this process
+        self._owner = True
+        # locks and events of `multiprocessing` or `threading`
+        self._lock: Any
+        self._running_event: Any
+        self._value_event: Any
         if TYPE_CHECKING:
             self._shared_node_id: Synchronized[int]
+            self._shared_generation: Synchronized[int]
+            self._shared_lease_expiry: Synchronized[float]
+
+        if self.listener == ListenerMode.PROCESS:
+            # Shared objects
+            self._lock = multiprocessing.Lock()
+            self._running_event = multiprocessing.Event()
+            self._value_event = multiprocessing.Event()
+            # written with the lock, and read without lock
+            self._shared_node_id = multiprocessing.RawValue("q", INVALID_VALUE)  # type: ignore
+            # incremented whenever the node ID is reassigned or lost
+            self._shared_generation = multiprocessing.RawValue("Q", generation)  # type: ignore
+            self._shared_lease_expiry = multiprocessing.RawValue("d", 0.0)  # type: ignore
         else:
-            self._shared_node_id = multiprocessing.Value("q", INVALID_VALUE)
+            # objects of this process, read without locking
+            self._lock = threading.Lock()
+            self._running_event = threading.Event()
+            self._value_event = threading.Event()
+            self._shared_node_id = ctypes.c_int64(INVALID_VALUE)  # type: ignore
+            self._shared_generation = ctypes.c_uint64(generation)  # type: ignore
+            self._shared_lease_expiry = ctypes.c_double(0.0)  # type: ignore
+
+    @property
+    def generation(self) -> int:
+        """
+        Counter that changes whenever the allocated node ID is reassigned or lost.
+        A node ID obtained by `get` can be cached while this value is unchanged.
+        """
+        return self._shared_generation.value
+
+    @property
+    def lease_expiry(self) -> float:
+        """
+        Time (`time.monotonic()`) when the lease of the node ID expires, unless it is renewed.
+        """
+        return self._shared_lease_expiry.value
+
+    def _invalidate(self):
+        self._shared_generation.value += 1
 
     @property
     def refresh_rate(self):
         return self.timeout / 2 * random.random()
 
     def __del__(self):
+        if not hasattr(self, "_lock"):
+            # failed to initialize
+            return
         try:
             self.stop()
         except OSError:  # pragma: nocover
             pass
 
     @abc.abstractmethod
-    def listen(self) -> Iterator[Optional[int]]:
-        """Listen for allocated node ID."""
+    def listen(self) -> Generator[Union[None, int, Lease], None, None]:
+        """
+        Listen for allocated node ID.
+        A node ID without `Lease` is leased for `timeout` seconds from when it is received.
+        """
+
+    def _receive(self, seq: Union[None, int, Lease], listener: Any) -> bool:
+        """
+        Store the node ID received by `listen` of `listener`. Returns False if the pool has been
+        stopped, or `listener` has been replaced by a new one after it was stopped.
+        """
+        if isinstance(seq, int):
+            seq = Lease(seq, time.monotonic() + self.timeout)
+        with self._lock:
+            if not self._running_event.is_set() or self._listener is not listener:
+                return False
+            if seq is not None:
+                # the expiry is written last, so a reader seeing a fresh lease sees its node ID
+                self._node_id = seq.node_id
+                self._shared_lease_expiry.value = seq.expires_at
+                self._value_event.set()
+        return True
+
+    def _run_listener_process(self):
+        # the handle of the listener is not usable in the listener itself
+        self._listener = None
+        self._start_listening()
 
     def _start_listening(self):
-        self._subprocess = None
+        # the thread running this, or None in the listener process
+        listener = self._listener
         try:
             for seq in self.listen():
-                with self._lock:
-                    if not self._running_event.is_set():
-                        return
-                    if seq is not None:
-                        self._node_id = seq
-                        self._value_event.set()
+                if not self._receive(seq, listener):
+                    return
                 time.sleep(self.refresh_rate)
             else:
-                self.stop()
+                if self._listener is listener:
+                    self.stop()
 
         except KeyboardInterrupt:
             self.stop()
 
         except Exception as e:
             logging.exception(e)
-            self.fail()
+            # a replaced listener must not fail the new one
+            if self._listener is listener:
+                self.fail()
+
+    async def _astart_listening(self):
+        loop = asyncio.get_running_loop()
+        listener = asyncio.current_task()
+        try:
+            iterator = self.listen()
+            while True:
+                # `listen` may block, so each step runs in the executor
+                seq = await loop.run_in_executor(None, next, iterator, _END)
+                if seq is _END:
+                    if self._listener is listener:
+                        self.stop()
+                    return
+                if not self._receive(seq, listener):  # type: ignore
+                    return
+                await asyncio.sleep(self.refresh_rate)
+
+        except Exception as e:
+            logging.exception(e)
+            # a replaced listener must not fail the new one
+            if self._listener is listener:
+                self.fail()
+
+        finally:
+            # the task ends with its event loop (e.g. `asyncio.run`), so that a listener is
+            # started again by `aget` in the next loop
+            with self._lock:
+                if self._listener is listener:
+                    self._running_event.clear()
+                    self._listener = None
 
     def _stop_listening(self):
         self._running_event.clear()
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
         try:
-            if self._subprocess is not None:
-                self._subprocess.kill()
-                self._subprocess = None
+            if self.listener == ListenerMode.PROCESS:
+                listener.kill()
+            elif self.listener == ListenerMode.ASYNCIO:
+                listener.cancel()
+            # a thread ends at the next node ID, as it is no longer the listener
         except Exception:
             pass
 
@@ -82,28 +259,109 @@ class NodeIdPool(metaclass=SingletonABCMeta):
         with self._lock:
             if self._running_event.is_set():
                 return
+
+            if self.listener == ListenerMode.ASYNCIO:
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    # started again by `aget` in the event loop
+                    return
+                self._running_event.set()
+                self._listener = loop.create_task(self._astart_listening())
+                return
+
             self._running_event.set()
+            self._owner = True
+            if self.listener == ListenerMode.THREAD:
+                self._listener = threading.Thread(target=self._start_listening, daemon=True)
+                self._listener.start()
+                return
 
-            self._subprocess = multiprocessing.Process(target=self._start_listening, daemon=True)
-            self._subprocess.start()
+            self._listener = multiprocessing.Process(target=self._run_listener_process, daemon=True)
+            # the fork hook must not renew the pool in the listener itself
+            self._forking_listener = True
+            try:
+                self._listener.start()
+            finally:
+                self._forking_listener = False
 
     def fail(self):
         with self._lock:
+            self._shared_lease_expiry.value = 0.0
             self._node_id = INVALID_VALUE
             self._value_event.set()
             self._stop_listening()
 
     def stop(self):
+        if not self._owner:
+            # the listener and the node ID belong to the parent process
+            return
         with self._lock:
+            self._shared_lease_expiry.value = 0.0
             self._value_event.clear()
             self._stop_listening()
+            self._invalidate()
 
     def get(self) -> int:
+        """
+        Get the node ID. While its lease is fresh, it is returned without waiting or IPC.
+        Raises `LeaseExpiredError` if the lease is not renewed within `timeout` seconds.
+        """
+        node_id = self._read_fresh_node_id()
+        if node_id is not None:
+            return node_id
+
+        deadline = time.monotonic() + self.timeout
         self.start()
 
+        if not self._running_event.is_set() and not self._value_event.is_set():
+            raise RuntimeError("the asyncio listener requires a running event loop, use aget")
         if not self._value_event.wait(timeout=self.timeout):
             raise TimeoutError("cannot get sequence value from server")
 
+        while (node_id := self._read_fresh_node_id()) is None:
+            self._check_lease_deadline(deadline)
+            time.sleep(LEASE_POLL_INTERVAL)
+        return node_id
+
+    async def aget(self) -> int:
+        """
+        Same as `get`, but wait for the node ID without blocking the event loop.
+        """
+        node_id = self._read_fresh_node_id()
+        if node_id is not None:
+            return node_id
+
+        deadline = time.monotonic() + self.timeout
+        self.start()
+
+        if not self._value_event.is_set():
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(None, self._value_event.wait, self.timeout):
+                raise TimeoutError("cannot get sequence value from server")
+
+        while (node_id := self._read_fresh_node_id()) is None:
+            self._check_lease_deadline(deadline)
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+        return node_id
+
+    def _read_fresh_node_id(self) -> Optional[int]:
+        """
+        Get the node ID if its lease is fresh, otherwise None.
+        """
+        generation = self.generation
+        node_id = self._node_id
+        if self.lease_expiry > time.monotonic() and self.generation == generation:
+            return node_id
+        return None
+
+    def _check_lease_deadline(self, deadline: float):
+        # raises ConnectionError if the listener has failed
+        self._read_node_id()
+        if time.monotonic() >= deadline:
+            raise LeaseExpiredError(self._node_id)
+
+    def _read_node_id(self) -> int:
         node_id = self._node_id
         if node_id == INVALID_VALUE:
             raise ConnectionError("failed to listening server")
@@ -115,4 +373,26 @@ class NodeIdPool(metaclass=SingletonABCMeta):
 
     @_node_id.setter
     def _node_id(self, node_id: int):
-        self._shared_node_id.value = node_id
+        if self._shared_node_id.value != node_id:
+            self._shared_node_id.value = node_id
+            self._invalidate()
+
+    def _after_fork(self):
+        if self._forking_listener:
+            return
+        if self.on_fork == ForkPolicy.SHARE:
+            # the handle of the listener is not usable in the child
+            self._listener = None
+            self._owner = False
+        else:
+            # a new generation, so that node IDs cached in the parent are not used
+            self._init_shared(self.generation + 1)
+
+    @classmethod
+    def _after_fork_all(cls):
+        for pool in list(cls._instances):
+            pool._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=NodeIdPool._after_fork_all)
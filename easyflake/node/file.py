@@ -10,6 +10,7 @@ from lockfile import LockFile
 from easyflake.exceptions import SequenceOverflowError
 from easyflake.sequence import SimpleSequencePool
 
+from .base import Lease
 from .base import NodeIdPool as BaseNodeIdPool
 
 SEP = ":"
@@ -54,6 +55,8 @@ class NodeIdPool(BaseNodeIdPool):
         sequence = None
 
         while True:
+            # measured before the line is prolonged, so that the lease expires before the line
+            expires_at = time.monotonic() + LIFESPAN
             with LockFile(self.endpoint):
                 pool = SimpleSequencePool()
                 new_lines = self._readlines(pool, sequence)
@@ -70,7 +73,7 @@ class NodeIdPool(BaseNodeIdPool):
                 with open(self.endpoint, "w+") as f:
                     f.write(os.linesep.join(new_lines))
 
-            yield sequence
+            yield None if sequence is None else Lease(sequence, expires_at)
 
     def _readlines(self, pool: SimpleSequencePool, update_sequence: Optional[int]) -> List[str]:
         new_lines: List[str] = []
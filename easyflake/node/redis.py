@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Generator, Optional
+
+from easyflake.utils.optional import import_redis
+
+from .base import Lease
+from .base import NodeIdPool as BaseNodeIdPool
+
+LIFESPAN = 10
+KEY_PREFIX = "easyflake:node_id"
+# the number of node IDs scanned by a call of the claim script, so that the server is not
+# blocked by a scan of every node ID
+CLAIM_BATCH = 256
+
+# claims the first key which does not exist, and returns its index or -1
+CLAIM_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    if redis.call("SET", key, ARGV[1], "NX", "PX", ARGV[2]) then
+        return i - 1
+    end
+end
+return -1
+"""
+# prolongs the key, unless it has been claimed by another pool after it expired
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class _HeldLease:
+    token: str
+    expires_at: float
+
+
+class _Server:
+    """
+    Connections to a Redis server shared by the pools of this process, and the leases held by
+    them. The leases are renewed together in a pipeline, so pools listened by threads of the
+    same process share one round trip per heartbeat.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.claim = client.register_script(CLAIM_SCRIPT)
+        self.renew_script = client.register_script(RENEW_SCRIPT)
+        self.release_script = client.register_script(RELEASE_SCRIPT)
+        self._lock = threading.Lock()
+        self._leases: Dict[str, _HeldLease] = {}
+
+    def hold(self, key: str, token: str, expires_at: float):
+        with self._lock:
+            self._leases[key] = _HeldLease(token, expires_at)
+
+    def release(self, key: str, token: str):
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease.token == token:
+                del self._leases[key]
+        self.release_script(keys=[key], args=[token])
+
+    def renew(self, key: str, token: str) -> Optional[float]:
+        """
+        Renew the lease of `key` with the other leases held in this process, unless another
+        pool has renewed it recently. Returns the new expiry, or None if the lease is lost.
+        """
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None or lease.token != token:
+                return None
+            if lease.expires_at - time.monotonic() > LIFESPAN / 2:
+                return lease.expires_at
+
+            # measured before the keys are prolonged, so that the leases expire before the keys
+            expires_at = time.monotonic() + LIFESPAN
+            keys = list(self._leases)
+            pipeline = self.client.pipeline(transaction=False)
+            for held_key in keys:
+                held_token = self._leases[held_key].token
+                self.renew_script(
+                    keys=[held_key], args=[held_token, LIFESPAN * 1000], client=pipeline
+                )
+            for held_key, renewed in zip(keys, pipeline.execute()):
+                if renewed:
+                    self._leases[held_key].expires_at = expires_at
+                else:
+                    del self._leases[held_key]
+
+            lease = self._leases.get(key)
+            return None if lease is None else lease.expires_at
+
+
+class _Servers:
+    # servers by URL, which are not inherited by forked processes
+    _servers: Dict[str, _Server] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, url: str) -> _Server:
+        with cls._lock:
+            if url not in cls._servers:
+                redis = import_redis()
+                pool = redis.ConnectionPool.from_url(url, decode_responses=True)
+                cls._servers[url] = _Server(redis.Redis(connection_pool=pool))
+            return cls._servers[url]
+
+    @classmethod
+    def _after_fork(cls):
+        cls._lock = threading.Lock()
+        cls._servers = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_Servers._after_fork)
+
+
+def node_key(bits: int, node_id: int) -> str:
+    # the keys of the same bits share a hash tag, so that a script may access them together
+    return f"{{{KEY_PREFIX}:{bits}}}:{node_id}"
+
+
+class NodeIdPool(BaseNodeIdPool):
+    def _claim(self, server: _Server, token: str) -> Optional[int]:
+        """Claim the lowest node ID whose key does not exist. Returns None if every one is held."""
+        slots = 1 << self.bits
+        for start in range(0, slots, CLAIM_BATCH):
+            keys = [node_key(self.bits, i) for i in range(start, min(start + CLAIM_BATCH, slots))]
+            index = server.claim(keys=keys, args=[token, LIFESPAN * 1000])
+            if index >= 0:
+                return start + index
+        return None
+
+    def listen(self) -> Generator[Optional[Lease], None, None]:
+        server = _Servers.get(self.endpoint)
+        # identifies this listener, even if the process ID is reused
+        token = uuid.uuid4().hex
+        lease: Optional[Lease] = None
+
+        try:
+            while True:
+                if lease is not None:
+                    expires_at = server.renew(node_key(self.bits, lease.node_id), token)
+                    lease = None if expires_at is None else Lease(lease.node_id, expires_at)
+
+                if lease is None:
+                    # measured before the key is written, so that the lease expires before the key
+                    expires_at = time.monotonic() + LIFESPAN
+                    node_id = self._claim(server, token)
+                    if node_id is not None:
+                        lease = Lease(node_id, expires_at)
+                        server.hold(node_key(self.bits, node_id), token, expires_at)
+
+                yield lease
+        finally:
+            if lease is not None:
+                server.release(node_key(self.bits, lease.node_id), token)
@@ -0,0 +1,182 @@
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Generator, Optional
+
+from easyflake.state import _InterProcessLock
+
+from .base import Lease
+from .base import NodeIdPool as BaseNodeIdPool
+
+LIFESPAN = 10
+
+# header: magic, node ID bits
+HEADER = struct.Struct("<4sI")
+MAGIC = b"EFNS"
+# slot of each node ID: token of the owner (0 if free), expiry of the lease (`time.time()`)
+SLOT = struct.Struct("<Qd")
+
+
+@dataclass
+class _OpenFile:
+    fd: int
+    mmap: mmap.mmap
+    bits: int
+    # the number of `SlotFile` using the file
+    refs: int = 0
+
+
+class SlotFile:
+    # files opened by this process by path. Locks of `fcntl.lockf` belong to the process, and
+    # closing any descriptor of the file releases all of them, so pools of the same file
+    # share one descriptor, which is closed with the last of them.
+    _files: Dict[str, _OpenFile] = {}
+    _files_lock = threading.Lock()
+
+    def __init__(self, path: str, bits: int):
+        """
+        A file with a fixed-size slot for each node ID, which is memory-mapped.
+        Each slot is locked by `fcntl.lockf` on its own bytes, so claiming or renewing a node ID
+        writes only its slot without blocking the others. POSIX only.
+
+        Args:
+            path (str): The path to the file.
+            bits (int): The number of bits of node IDs. Every pool of the file must use the same.
+        """
+        self.path = os.path.realpath(path)
+        self.bits = bits
+        self.size = HEADER.size + SLOT.size * (1 << bits)
+
+        with SlotFile._files_lock:
+            file = SlotFile._files.get(self.path)
+            if file is None:
+                file = SlotFile._files[self.path] = self._open()
+            elif file.bits != bits:
+                raise ValueError(f"{self.path} is not a slot file of {self.bits} bits.")
+            file.refs += 1
+        self._file: Optional[_OpenFile] = file
+        self._fd = file.fd
+        self._mmap = file.mmap
+
+    def _open(self) -> _OpenFile:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with _InterProcessLock(fd, self.path, HEADER.size):
+                self._init_header(fd)
+            return _OpenFile(fd, mmap.mmap(fd, self.size), self.bits)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def _init_header(self, fd: int):
+        file_size = os.fstat(fd).st_size
+        if file_size == 0:
+            os.ftruncate(fd, self.size)
+            os.pwrite(fd, HEADER.pack(MAGIC, self.bits), 0)
+            return
+
+        header = os.pread(fd, HEADER.size, 0)
+        if file_size != self.size or HEADER.unpack(header) != (MAGIC, self.bits):
+            raise ValueError(f"{self.path} is not a slot file of {self.bits} bits.")
+
+    def close(self):
+        with SlotFile._files_lock:
+            file, self._file = self._file, None
+            if file is None:
+                return
+            file.refs -= 1
+            if file.refs > 0:
+                return
+            if SlotFile._files.get(self.path) is file:
+                del SlotFile._files[self.path]
+        file.mmap.close()
+        os.close(file.fd)
+
+    @classmethod
+    def _after_fork(cls):
+        # the lock may be held by a thread which does not exist in the child, and the files
+        # are left to the slot files inherited from the parent
+        cls._files_lock = threading.Lock()
+        cls._files = {}
+
+    def _lock(self, node_id: int) -> _InterProcessLock:
+        return _InterProcessLock(self._fd, self.path, SLOT.size, self._offset(node_id))
+
+    def _offset(self, node_id: int) -> int:
+        return HEADER.size + SLOT.size * node_id
+
+    def claim(self, token: int, expire: float) -> Optional[int]:
+        """
+        Claim a free or expired slot for `token` until `expire`, and return its node ID.
+        Slots are scanned from a random one, so that pools do not contend for the same slot.
+        Returns None if every slot is taken.
+        """
+        slots = 1 << self.bits
+        start = random.randrange(slots)
+        now = time.time()
+        for i in range(slots):
+            node_id = (start + i) % slots
+            lock = self._lock(node_id)
+            # a slot locked by another pool is being claimed or renewed
+            if not lock.acquire(False):
+                continue
+            try:
+                owner, owner_expire = SLOT.unpack_from(self._mmap, self._offset(node_id))
+                if owner == 0 or owner_expire < now:
+                    SLOT.pack_into(self._mmap, self._offset(node_id), token, expire)
+                    return node_id
+            finally:
+                lock.release()
+        return None
+
+    def renew(self, node_id: int, token: int, expire: float) -> bool:
+        """
+        Prolong the slot of `token` until `expire`.
+        Returns False if the slot has been claimed by another pool after it expired.
+        """
+        with self._lock(node_id):
+            owner, _ = SLOT.unpack_from(self._mmap, self._offset(node_id))
+            if owner != token:
+                return False
+            SLOT.pack_into(self._mmap, self._offset(node_id), token, expire)
+            return True
+
+    def release(self, node_id: int, token: int):
+        """Free the slot of `token`, unless it has been claimed by another pool."""
+        with self._lock(node_id):
+            owner, _ = SLOT.unpack_from(self._mmap, self._offset(node_id))
+            if owner == token:
+                SLOT.pack_into(self._mmap, self._offset(node_id), 0, 0.0)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=SlotFile._after_fork)
+
+
+class NodeIdPool(BaseNodeIdPool):
+    def listen(self) -> Generator[Optional[Lease], None, None]:
+        slot_file = SlotFile(self.endpoint, self.bits)
+        # identifies this listener, even if the process ID is reused
+        token = int.from_bytes(os.urandom(8), "little") or 1
+        node_id: Optional[int] = None
+
+        try:
+            while True:
+                # measured before the slot is written, so that the lease expires before the slot
+                expires_at = time.monotonic() + LIFESPAN
+                expire = time.time() + LIFESPAN
+
+                if node_id is not None and not slot_file.renew(node_id, token, expire):
+                    node_id = None
+                if node_id is None:
+                    node_id = slot_file.claim(token, expire)
+
+                yield None if node_id is None else Lease(node_id, expires_at)
+        finally:
+            if node_id is not None:
+                slot_file.release(node_id, token)
+            slot_file.close()
@@ -0,0 +1,145 @@
+import os
+import random
+import sqlite3
+import time
+from typing import Generator, Optional
+
+from .base import Lease
+from .base import NodeIdPool as BaseNodeIdPool
+
+LIFESPAN = 10
+# interval to retry the setup of a database which is being created by another process
+SETUP_RETRY_INTERVAL = 0.01
+TABLE = "easyflake_node_ids"
+
+# one row for each node ID of each bits, free while `token` is NULL or `expire` has passed
+CREATE_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    bits INTEGER NOT NULL,
+    node_id INTEGER NOT NULL,
+    token INTEGER,
+    pid INTEGER,
+    expire REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (bits, node_id)
+) WITHOUT ROWID
+"""
+INSERT_SLOTS = f"""
+INSERT OR IGNORE INTO {TABLE} (bits, node_id)
+WITH RECURSIVE slots(node_id) AS (
+    SELECT 0 UNION ALL SELECT node_id + 1 FROM slots WHERE node_id + 1 < :slots
+)
+SELECT :bits, node_id FROM slots
+"""
+# claims the lowest free or expired node ID in a single statement
+CLAIM = f"""
+UPDATE {TABLE} SET token = :token, pid = :pid, expire = :expire
+WHERE bits = :bits AND node_id = (
+    SELECT node_id FROM {TABLE}
+    WHERE bits = :bits AND (token IS NULL OR expire < :now)
+    ORDER BY node_id LIMIT 1
+)
+"""
+SELECT_CLAIMED = f"SELECT node_id FROM {TABLE} WHERE bits = :bits AND token = :token"
+RENEW = f"""
+UPDATE {TABLE} SET expire = :expire
+WHERE bits = :bits AND node_id = :node_id AND token = :token
+"""
+RELEASE = f"""
+UPDATE {TABLE} SET token = NULL, pid = NULL, expire = 0
+WHERE bits = :bits AND node_id = :node_id AND token = :token
+"""
+
+
+class LeaseTable:
+    def __init__(self, path: str, bits: int, timeout: float):
+        """
+        Table of node ID leases in a SQLite database in WAL mode.
+
+        Args:
+            path (str): The path to the database.
+            bits (int): The number of bits of node IDs. Pools with other bits use other rows.
+            timeout (float): Seconds to wait for a write lock of the database.
+        """
+        self.bits = bits
+        # the listener may be stepped by threads of an executor, one at a time
+        self._conn = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        try:
+            self._setup(timeout)
+        except BaseException:
+            self._conn.close()
+            raise
+
+    def _setup(self, timeout: float):
+        # switching a new database to WAL may fail at once without waiting for the busy timeout,
+        # when many processes open it at the same time
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                with self._transaction():
+                    self._conn.execute(CREATE_TABLE)
+                    self._conn.execute(INSERT_SLOTS, {"bits": self.bits, "slots": 1 << self.bits})
+                return
+            except sqlite3.OperationalError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(SETUP_RETRY_INTERVAL * (1 + random.random()))
+
+    def _transaction(self):
+        # the write lock is taken at the start, so that readers do not have to upgrade it
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def close(self):
+        self._conn.close()
+
+    def claim(self, token: int, expire: float) -> Optional[int]:
+        """
+        Claim the lowest free or expired node ID for `token` until `expire`.
+        Returns None if every node ID is taken.
+        """
+        params = {"bits": self.bits, "token": token, "pid": os.getpid()}
+        with self._transaction():
+            self._conn.execute(CLAIM, {**params, "expire": expire, "now": time.time()})
+            row = self._conn.execute(SELECT_CLAIMED, params).fetchone()
+        return None if row is None else row[0]
+
+    def renew(self, node_id: int, token: int, expire: float) -> bool:
+        """
+        Prolong the node ID of `token` until `expire`.
+        Returns False if the node ID has been claimed by another pool after it expired.
+        """
+        params = {"bits": self.bits, "node_id": node_id, "token": token, "expire": expire}
+        return self._conn.execute(RENEW, params).rowcount == 1
+
+    def release(self, node_id: int, token: int):
+        """Free the node ID of `token`, unless it has been claimed by another pool."""
+        self._conn.execute(RELEASE, {"bits": self.bits, "node_id": node_id, "token": token})
+
+
+class NodeIdPool(BaseNodeIdPool):
+    def listen(self) -> Generator[Optional[Lease], None, None]:
+        table = LeaseTable(self.endpoint, self.bits, self.timeout)
+        # identifies this listener, even if the process ID is reused
+        token = int.from_bytes(os.urandom(8), "little") >> 1 or 1
+        node_id: Optional[int] = None
+
+        try:
+            while True:
+                # measured before the row is written, so that the lease expires before the row
+                expires_at = time.monotonic() + LIFESPAN
+                expire = time.time() + LIFESPAN
+
+                if node_id is not None and not table.renew(node_id, token, expire):
+                    node_id = None
+                if node_id is None:
+                    node_id = table.claim(token, expire)
+
+                yield None if node_id is None else Lease(node_id, expires_at)
+        finally:
+            if node_id is not None:
+                table.release(node_id, token)
+            table.close()
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import timedelta
+from typing import Deque, Optional, Tuple
+
+from easyflake import logging
+from easyflake.easyflake import EasyFlake
+
+__all__ = [
+    "PrefetchingEasyFlake",
+]
+
+
+class PrefetchingEasyFlake(EasyFlake):
+    _instances: "weakref.WeakSet[PrefetchingEasyFlake]" = weakref.WeakSet()
+
+    def __init__(
+        self,
+        *args,
+        low_water: int = 256,
+        high_water: int = 1024,
+        max_staleness: timedelta = timedelta(seconds=1),
+        **kwargs,
+    ):
+        """
+        EasyFlake that keeps a buffer of generated IDs and refills it in a background thread,
+        so `get_id` is a pop from the buffer.
+
+        IDs are unique, but not strictly ordered between IDs from the buffer and IDs generated
+        directly when the buffer is empty.
+
+        Args:
+            low_water (int): The buffer is refilled when it has fewer IDs than this.
+            high_water (int): The number of IDs in the buffer after refilling.
+            max_staleness (timedelta): IDs in the buffer older than this are discarded.
+            The other arguments are the same as `EasyFlake`.
+        """
+        if not 0 <= low_water < high_water:
+            raise ValueError(
+                "low_water and high_water are required to be 0 <= low_water < high_water, "
+                f"but {low_water} and {high_water} are given."
+            )
+        super().__init__(*args, **kwargs)
+
+        self.low_water = low_water
+        self.high_water = high_water
+
+        clock = self._sequence_provider.clock
+        staleness_ns = (max_staleness // timedelta(microseconds=1)) * 1000
+        self._staleness_ticks = staleness_ns // clock.tick_ns
+
+        self._buffer: Deque[int] = deque()
+        # generation of the pool and lease expiry of the node ID of the buffered IDs
+        self._buffer_lease: Optional[Tuple[Optional[int], float]] = None
+        self._refill_event = threading.Event()
+        self._closed = False
+        self._start()
+        PrefetchingEasyFlake._instances.add(self)
+
+    def _start(self):
+        self._refill_event.set()
+        thread = threading.Thread(target=self._refill, args=(weakref.ref(self),), daemon=True)
+        thread.start()
+
+    @staticmethod
+    def _refill(ref: "weakref.ReferenceType[PrefetchingEasyFlake]"):
+        # hold only a weak reference so the thread ends with the generator
+        while (flake := ref()) is not None and not flake._closed:
+            event = flake._refill_event
+            if event.is_set():
+                event.clear()
+                try:
+                    flake._fill()
+                except Exception as e:
+                    logging.exception(e)
+            del flake
+            event.wait(timeout=1)
+
+    def _fill(self):
+        cache = self._get_node_id_cache()
+        lease = self._buffer_lease
+        if lease is None or lease[0] != cache[0]:
+            # the IDs with the former node ID are discarded
+            self._discard()
+        count = self.high_water - len(self._buffer)
+        if count <= 0:
+            return
+        ids = self.get_ids(count)
+        if self._node_id_cache is not cache:
+            # the node ID is changed while generating IDs
+            return
+        self._buffer.extend(ids)
+        self._buffer_lease = (cache[0], cache[3])
+
+    def _discard(self):
+        self._buffer_lease = None
+        self._buffer.clear()
+
+    def _is_lease_valid(self) -> bool:
+        """
+        Whether the node ID of the buffered IDs is still held by this node.
+        """
+        pool = self._node_id_pool
+        if pool is None:
+            return True
+        lease = self._buffer_lease
+        if lease is None or pool.generation != lease[0]:
+            return False
+        if lease[1] > time.monotonic():
+            return True
+        # the lease of the same node ID may have been renewed
+        expires_at = pool.lease_expiry
+        if expires_at > time.monotonic() and pool.generation == lease[0]:
+            self._buffer_lease = (lease[0], expires_at)
+            return True
+        return False
+
+    def _pop(self):
+        """
+        Pop a fresh ID from the buffer, or return None if the buffer is empty.
+        The buffer is discarded if the node ID may have been given to another node.
+        """
+        buffer = self._buffer
+        if buffer and not self._is_lease_valid():
+            self._discard()
+        min_timestamp = self._sequence_provider.clock.current() - self._staleness_ticks
+        try:
+            while True:
+                flake_id = buffer.popleft()
+                if flake_id >> self._timestamp_shift >= min_timestamp:
+                    return flake_id
+        except IndexError:
+            return None
+        finally:
+            if len(buffer) < self.low_water:
+                self._refill_event.set()
+
+    @property
+    def buffered(self) -> int:
+        """number of IDs in the buffer."""
+        return len(self._buffer)
+
+    def get_id(self):
+        flake_id = self._pop()
+        if flake_id is None:
+            return super().get_id()
+        return flake_id
+
+    async def aget_id(self) -> int:
+        flake_id = self._pop()
+        if flake_id is None:
+            return await super().aget_id()
+        return flake_id
+
+    def close(self):
+        """stop refilling and discard the buffer."""
+        self._closed = True
+        self._refill_event.set()
+        self._discard()
+
+    @classmethod
+    def _after_fork(cls):
+        # the buffered IDs are also handed out by the parent process
+        for flake in list(cls._instances):
+            flake._discard()
+            if not flake._closed:
+                flake._start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=PrefetchingEasyFlake._after_fork)
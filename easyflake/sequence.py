@@ -1,21 +1,37 @@
-import math
+import asyncio
 from dataclasses import dataclass
 from datetime import timedelta
-from multiprocessing import Value
-from multiprocessing.sharedctypes import Synchronized
-from typing import TYPE_CHECKING, Dict, Set
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type, Union
 
-from easyflake.clock import ScaledClock
-from easyflake.exceptions import SequenceOverflowError
+from easyflake.clock import BaseClock, ScaledClock, TickDuration
+from easyflake.exceptions import ClockRollbackError, SequenceOverflowError
+from easyflake.state import SEQUENCE, TIMESTAMP, BaseSequenceState, LocalSequenceState
+from easyflake.wait import BaseWaitStrategy, SleepWait
 
 __all__ = [
     "TimeSequence",
+    "TimeSequenceRange",
     "TimeSequenceProvider",
+    "RollbackPolicy",
     "SimpleSequencePool",
 ]
 
 
 LOCK_TO = 2
+# the longest interval to retry the lock held by another thread or process in `_aclaim`
+LOCK_RETRY_INTERVAL = 0.001
+
+
+class RollbackPolicy(str, Enum):
+    """How `TimeSequenceProvider` behaves when the clock moves backwards."""
+
+    # keep using the last timestamp with the remaining sequence
+    REUSE = "reuse"
+    # wait until the clock catches up, if it is behind by `rollback_ticks` or less
+    WAIT = "wait"
+    # raise `ClockRollbackError` immediately
+    RAISE = "raise"
 
 
 @dataclass(frozen=True)
@@ -24,71 +40,319 @@ class TimeSequence:
     value: int
 
 
+@dataclass(frozen=True)
+class TimeSequenceRange:
+    timestamp: int
+    start: int
+    stop: int
+
+    def __len__(self):
+        return self.stop - self.start
+
+
 class TimeSequenceProvider:
     """A class for generating a sequence of numbers based on a time scale."""
 
-    def __init__(self, bits: int, epoch: float, time_scale: int):
+    def __init__(
+        self,
+        bits: int,
+        epoch: float,
+        time_scale: TickDuration,
+        *,
+        borrow_ticks: int = 0,
+        rollback_policy: RollbackPolicy = RollbackPolicy.REUSE,
+        rollback_ticks: int = 0,
+        on_rollback: Optional[Callable[[int], None]] = None,
+        clock: Union[BaseClock, Type[BaseClock]] = ScaledClock,
+        wait_strategy: Optional[BaseWaitStrategy] = None,
+        state: Optional[BaseSequenceState] = None,
+    ):
         """
         Args:
             bits (int): The bits of sequential ID.
             epoch (float): The base datetime to calculate the timestamp
-            time_scale (int): The scale of the timestamp to use. The ID sequence will
-                              be incremented at intervals determined by the scale.
+            time_scale (int, timedelta): The scale of the timestamp to use, or the duration
+                                         of a tick. The ID sequence will be incremented at
+                                         intervals determined by the scale.
+            borrow_ticks (int): The maximum number of ticks the timestamp may run ahead of the
+                                clock when the sequence is exhausted ("borrow-ahead").
+                                Defaults to 0, i.e. wait until the next tick.
+            rollback_policy (RollbackPolicy): The behavior when the clock moves backwards.
+            rollback_ticks (int): The maximum number of ticks to wait for the clock
+                                  with `RollbackPolicy.WAIT`.
+            on_rollback (callable): Called with the number of ticks the clock is behind when a
+                                    rollback is detected. It is called while the lock is held.
+            clock (BaseClock, type): The clock, or the clock class which is created with
+                                     `time_scale` and `epoch`. Defaults to `ScaledClock`.
+            wait_strategy (BaseWaitStrategy): How to wait for the next tick when the sequence
+                                              is exhausted. Defaults to `SleepWait`.
+            state (BaseSequenceState): Where the last timestamp and the next sequence value are
+                                       shared. Use `NamedSequenceState` to share them with
+                                       independent processes. Defaults to `LocalSequenceState`.
         """
-        self._bits = bits + 1
+        if borrow_ticks < 0:
+            raise ValueError(f"borrow_ticks is required to be >=0, but {borrow_ticks} is given.")
+        if rollback_ticks < 0:
+            raise ValueError(
+                f"rollback_ticks is required to be >=0, but {rollback_ticks} is given."
+            )
+        if not 0 < bits < 64:
+            raise ValueError(f"bits is required to be >0 and <64, but {bits} is given.")
+
+        self._borrow_ticks = borrow_ticks
 
-        self._sequence_max = 2**bits - 1
-        self._sequence_mask = 2**self._bits - 1
+        self._rollback_policy = RollbackPolicy(rollback_policy)
+        self._rollback_ticks = rollback_ticks
+        self._on_rollback = on_rollback
+        self._rollback_count = 0
+        self._in_rollback = False
 
-        self._clock = ScaledClock(time_scale, epoch=epoch)
+        self._clock = clock(time_scale, epoch=epoch) if isinstance(clock, type) else clock
+        self._wait_strategy = wait_strategy or SleepWait()
 
-        _, val = self._attach_timestamp_to_value(0)
-        if TYPE_CHECKING:
-            self._shared: Synchronized[int]
-        self._shared = Value("Q", val)  # type: ignore
+        # the last timestamp and the next sequence value in separate words, so that
+        # the sequence can be as wide as 63 bits
+        self._shared = state or LocalSequenceState()
+
+        # the sequence of each tick counts up within the lane of the process
+        self._lane_shift = bits - self._shared.lane_bits
+        if self._lane_shift < 1:
+            raise ValueError(
+                f"lane_bits is required to be <{bits}, but {self._shared.lane_bits} is given."
+            )
+        self._sequence_max = 2**self._lane_shift - 1
+
+    def _renew_state(self):
+        """
+        Stop sharing the sequence with the parent process, e.g. after fork with a new node ID.
+        Only the default state is renewed, as the other states are shared on purpose.
+        """
+        if type(self._shared) is LocalSequenceState:
+            self._shared = LocalSequenceState()
+
+    @property
+    def _lock(self):
+        # looked up every time, as a state may be replaced in a child process after fork
+        return self._shared.lock
+
+    @property
+    def _state(self):
+        return self._shared.words
+
+    @property
+    def _lane_offset(self) -> int:
+        return self._shared.lane << self._lane_shift
 
     def get_required_bits(self, delta: timedelta):
         """
         Get the number of bits to represent given years, days, hours, minutes, seconds.
         """
-        return math.floor(math.log(self._clock.future(delta), 2)) + 1
+        return max(self._clock.future(delta), 1).bit_length()
 
-    def _attach_timestamp_to_value(self, value: int):
-        current = self._clock.current()
-        return current, (current << self._bits) | value
+    @property
+    def clock(self) -> BaseClock:
+        return self._clock
 
-    def _detach_timestamp_from_value(self, value: int) -> int:
-        return value & self._sequence_mask
+    @property
+    def borrow_ticks(self) -> int:
+        return self._borrow_ticks
 
     @property
     def last_updated_timestamp(self):
         """
         Get the timestamp of the last modification to the shared value.
         """
-        return self._shared.value >> self._bits
+        return self._state[TIMESTAMP]
+
+    @property
+    def lead(self) -> int:
+        """
+        Get the number of ticks the last timestamp is ahead of the clock by borrowing.
+        """
+        return max(self.last_updated_timestamp - self._clock.current(), 0)
+
+    @property
+    def rollback_count(self) -> int:
+        """
+        Get the number of clock rollbacks detected in this process.
+        """
+        return self._rollback_count
+
+    def _detect_rollback(self, current: int, timestamp: int) -> bool:
+        """
+        Check whether the clock is behind the last timestamp more than borrowing or the lag of
+        the clock can explain, and apply the rollback policy.
+
+        Returns True if the caller has to wait for the clock.
+        """
+        behind = timestamp - current
+        if behind <= self._borrow_ticks + self._clock.lag_ticks:
+            self._in_rollback = False
+            return False
+
+        if not self._in_rollback:
+            self._in_rollback = True
+            self._rollback_count += 1
+            if self._on_rollback is not None:
+                self._on_rollback(behind)
+
+        if self._rollback_policy == RollbackPolicy.RAISE:
+            raise ClockRollbackError(behind)
+        if self._rollback_policy == RollbackPolicy.WAIT:
+            if behind > self._rollback_ticks:
+                raise ClockRollbackError(behind)
+            return True
+        return False
+
+    def _claim(self, count: int) -> Optional[TimeSequenceRange]:
+        """
+        Claim up to `count` sequence values of the current tick.
+        The caller must hold the lock of the shared value.
+
+        If the sequence of the last tick is exhausted, the following tick is borrowed as long as
+        it is within `borrow_ticks` ahead of the clock.
+        Returns None if no tick is available until the clock advances.
+        Raises ClockRollbackError if the clock moves backwards and the policy does not allow it.
+        """
+        current = self._clock.current()
+        timestamp = self.last_updated_timestamp
+        if current > timestamp:
+            self._in_rollback = False
+            timestamp, seq = current, 0
+        elif self._detect_rollback(current, timestamp):
+            return None
+        else:
+            seq = self._state[SEQUENCE]
+            if seq > self._sequence_max:
+                if timestamp + 1 - current > self._borrow_ticks:
+                    return None
+                timestamp, seq = timestamp + 1, 0
+
+        stop = min(seq + count, self._sequence_max + 1)
+        self._state[TIMESTAMP] = timestamp
+        self._state[SEQUENCE] = stop
+        offset = self._lane_offset
+        return TimeSequenceRange(timestamp, seq + offset, stop + offset)
+
+    def _available_at(self) -> int:
+        """
+        Get the tick of the clock where the sequence is available again.
+        """
+        return self.last_updated_timestamp + 1 - self._borrow_ticks
 
     def next(self):
         """
         Get the next ID in the sequence at a specific time scale. When the ID reaches
         its maximum value, wait until the next tick before generating a new ID.
         """
+        return TimeSequence(*self.next_raw())
+
+    def next_raw(self) -> Tuple[int, int]:
+        """
+        Same as `next`, but return a tuple of the timestamp and the sequence value.
+        """
+        shared = self._shared
         while True:
-            with self._shared.get_lock():
+            with shared.lock:
+                # the words may be replaced when the lock is acquired for the first time
+                state = shared.words
                 current = self._clock.current()
-                future = self.last_updated_timestamp
+                timestamp = state[TIMESTAMP]
+
+                # fast path: a new tick, or the next value of the current tick
+                if current > timestamp:
+                    self._in_rollback = False
+                    state[TIMESTAMP] = current
+                    state[SEQUENCE] = 1
+                    return current, shared.lane << self._lane_shift
+                seq = state[SEQUENCE]
+                if (
+                    seq <= self._sequence_max
+                    and timestamp - current <= self._borrow_ticks
+                    and not self._in_rollback
+                ):
+                    state[SEQUENCE] = seq + 1
+                    return timestamp, seq | (shared.lane << self._lane_shift)
+
+                claimed = self._claim(1)
+                if claimed is not None:
+                    return claimed.timestamp, claimed.start
+                future = self._available_at()
 
-                if current > future:
-                    seq = 0
-                    break
-                seq = self._detach_timestamp_from_value(self._shared.value)
-                if seq <= self._sequence_max:
-                    break
+            self._wait_strategy.wait(self._clock, current, future)
 
-            self._clock.sleep(current, future)
+    async def _aclaim(self, count: int) -> TimeSequenceRange:
+        """
+        Claim up to `count` sequence values without blocking the event loop.
+        The lock is not waited for, and the next tick is awaited with the lock released.
+        """
+        while True:
+            if not self._lock.acquire(False):
+                # the lock is held by another thread or process, possibly while it waits for
+                # the next tick in `reserve`, so the event loop is not kept busy
+                await asyncio.sleep(min(self._clock.tick_ns / 1_000_000_000, LOCK_RETRY_INTERVAL))
+                continue
+            try:
+                claimed = self._claim(count)
+                if claimed is not None:
+                    return claimed
+                current = self._clock.current()
+                future = self._available_at()
+            finally:
+                self._lock.release()
+
+            # the clock may have passed the tick since it is claimed
+            if current < future:
+                await self._clock.asleep(current, future)
+
+    async def anext_raw(self) -> Tuple[int, int]:
+        """
+        Same as `next_raw`, but await the next tick instead of blocking.
+        """
+        claimed = await self._aclaim(1)
+        return claimed.timestamp, claimed.start
+
+    async def areserve(self, n: int) -> List[TimeSequenceRange]:
+        """
+        Same as `reserve`, but await the next tick instead of blocking.
+        The lock is released while waiting, so the values of each tick may be interleaved
+        with other callers, but they are still unique and ordered.
+        """
+        if n < 1:
+            raise ValueError(f"n is required to be >0, but {n} is given.")
+
+        ranges: List[TimeSequenceRange] = []
+        while n > 0:
+            claimed = await self._aclaim(n)
+            ranges.append(claimed)
+            n -= len(claimed)
+        return ranges
+
+    def reserve(self, n: int) -> List[TimeSequenceRange]:
+        """
+        Reserve `n` sequence values at once, in the same order as calling `next` n times.
+
+        The lock of the shared value is acquired only once. If the sequence of a tick is
+        exhausted, the lock is kept while waiting for the next tick, so the reserved values
+        are contiguous runs of each tick.
+        """
+        if n < 1:
+            raise ValueError(f"n is required to be >0, but {n} is given.")
 
-        timestamp, seq_with_timestamp = self._attach_timestamp_to_value(seq)
-        self._shared.value = seq_with_timestamp + 1
-        return TimeSequence(timestamp, seq)
+        ranges: List[TimeSequenceRange] = []
+        with self._lock:
+            while n > 0:
+                claimed = self._claim(n)
+                if claimed is None:
+                    current = self._clock.current()
+                    future = self._available_at()
+                    # the clock may have passed the tick since it is claimed
+                    if current < future:
+                        self._wait_strategy.wait(self._clock, current, future)
+                    continue
+                ranges.append(claimed)
+                n -= len(claimed)
+        return ranges
 
 
 class SimpleSequencePool:
@@ -0,0 +1,268 @@
+import abc
+import ctypes
+import mmap
+import os
+import tempfile
+import threading
+import weakref
+from multiprocessing import Array, RawArray
+from typing import Any, Dict, Optional, Tuple
+
+from easyflake.exceptions import SequenceOverflowError
+
+# words of the shared state
+TIMESTAMP = 0
+SEQUENCE = 1
+STATE_WORDS = 2
+
+# directory of named states, a memory-backed file system if available
+SHM_DIR = "/dev/shm"
+
+
+class BaseSequenceState(abc.ABC):
+    """
+    Shared state of `TimeSequenceProvider`, i.e. the last timestamp and the next sequence value.
+
+    Attributes:
+        lock: The lock which has to be held while the words are accessed.
+              It supports `acquire(blocking)`, `release()` and the context manager protocol.
+        words: The words indexed by `TIMESTAMP` and `SEQUENCE`.
+        lane_bits: The number of high bits of the sequence used for the lane.
+        lane: The lane of the sequence which is used by this process.
+    """
+
+    lock: Any
+    words: "ctypes.Array[ctypes.c_uint64]"
+    lane_bits = 0
+    lane = 0
+
+
+class LocalSequenceState(BaseSequenceState):
+    def __init__(self):
+        """
+        State in an anonymous shared memory, shared with the processes forked after it is created.
+        """
+        self._shared = Array("Q", STATE_WORDS)
+        # the lock and the raw array, so that the words are accessed without locking again
+        self.lock = self._shared.get_lock()
+        self.words = self._shared.get_obj()  # type: ignore
+
+
+class _InterProcessLock:
+    """
+    A lock of a file, or of `length` bytes from `start` of it (the whole file if 0),
+    shared by threads and processes.
+
+    `fcntl.lockf` excludes other processes, but not other threads of the same process,
+    so a thread lock shared by every lock of the same range in the process is held as well.
+    """
+
+    # thread locks by the path of the file and the range
+    _thread_locks: Dict[Tuple[str, int, int], threading.Lock] = {}
+    _instances: "weakref.WeakSet[_InterProcessLock]" = weakref.WeakSet()
+
+    def __init__(self, fd: int, path: str, length: int = 0, start: int = 0):
+        import fcntl
+
+        self._fcntl = fcntl
+        self._fd = fd
+        self._key = (path, length, start)
+        self._thread_lock = self._thread_locks.setdefault(self._key, threading.Lock())
+        _InterProcessLock._instances.add(self)
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        try:
+            flags = self._fcntl.LOCK_EX if blocking else self._fcntl.LOCK_EX | self._fcntl.LOCK_NB
+            self._fcntl.lockf(self._fd, flags, self._key[1], self._key[2])
+        except OSError:
+            self._thread_lock.release()
+            if blocking:
+                raise
+            return False
+        return True
+
+    def release(self):
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, self._key[1], self._key[2])
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    @classmethod
+    def _after_fork(cls):
+        # thread locks may be held by threads which do not exist in the child
+        cls._thread_locks.clear()
+        for lock in list(cls._instances):
+            lock._thread_lock = cls._thread_locks.setdefault(lock._key, threading.Lock())
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_InterProcessLock._after_fork)
+
+
+class NamedSequenceState(BaseSequenceState):
+    def __init__(self, name: str, *, directory: Optional[str] = None):
+        """
+        State in a named shared memory, i.e. a memory-mapped file, locked by `fcntl.lockf`.
+        Any process on the host which attaches to the same name shares the sequence, even if it
+        is not forked from the creator (e.g. workers without preload). POSIX only.
+
+        Every process attaching to the same name must use the same node ID and tick.
+
+        Args:
+            name (str): The name of the state.
+            directory (str): The directory of the file. Defaults to /dev/shm if it exists,
+                             otherwise the temporary directory.
+        """
+        if not name or os.sep in name:
+            raise ValueError(f"name is required to be a file name, but {name!r} is given.")
+        if directory is None:
+            directory = SHM_DIR if os.path.isdir(SHM_DIR) else tempfile.gettempdir()
+
+        self.path = os.path.realpath(os.path.join(directory, f"easyflake-{name}"))
+        size = ctypes.sizeof(ctypes.c_uint64) * STATE_WORDS
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self.lock = _InterProcessLock(fd, self.path)
+            with self.lock:
+                # a new file is filled with zeros, i.e. no timestamp is used yet
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        # the file is kept open, as closing any descriptor of the file releases the lock
+        self._fd = fd
+        self.words = (ctypes.c_uint64 * STATE_WORDS).from_buffer(self._mmap)
+
+    def unlink(self):
+        """
+        Remove the name, so that processes attaching to it later do not share the sequence.
+        The processes already attached to it continue to share it.
+        """
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _NoLaneLock:
+    """A lock which cannot be acquired, because no lane is left for the process."""
+
+    def __init__(self, lane_bits: int):
+        self._lane_bits = lane_bits
+
+    def acquire(self, blocking: bool = True) -> bool:
+        raise SequenceOverflowError(self._lane_bits)
+
+    def release(self):
+        pass  # pragma: nocover
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass  # pragma: nocover
+
+
+class _LaneClaimLock:
+    """A lock which claims a lane for the process when it is acquired for the first time."""
+
+    def __init__(self, state: "StripedSequenceState"):
+        self._state = state
+        self._claim_lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        with self._claim_lock:
+            if self._state.lock is self:
+                self._state._claim_lane()
+        return self._state.lock.acquire(blocking)
+
+    def release(self):
+        self._state.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # pragma: nocover
+        pass
+    return True
+
+
+class StripedSequenceState(BaseSequenceState):
+    _instances: "weakref.WeakSet[StripedSequenceState]" = weakref.WeakSet()
+
+    def __init__(self, lane_bits: int):
+        """
+        State split into lanes by the high `lane_bits` bits of the sequence. Each process uses
+        its own lane, which is assigned when the state is created or the process is forked,
+        so processes generate IDs without a lock shared with other processes. Threads of a
+        process still share a thread lock. A forked process claims its lane when it generates
+        an ID for the first time, so helper processes (e.g. the listener of a node ID pool)
+        do not occupy lanes.
+
+        The sequence of each tick is reduced to `sequence_bits - lane_bits` bits per process,
+        and at most 2 ** lane_bits processes (including the creator) can be alive at once.
+        The lane of an exited process is reused by a new process, which continues the sequence
+        of the lane.
+
+        Args:
+            lane_bits (int): The number of bits of the sequence used for the lane.
+        """
+        if lane_bits < 1:
+            raise ValueError(f"lane_bits is required to be >0, but {lane_bits} is given.")
+        self.lane_bits = lane_bits
+        lanes = 1 << lane_bits
+
+        # words of every lane, each of which is written only by the process using it
+        self._words = RawArray("Q", lanes * STATE_WORDS)
+        # process ID using each lane
+        self._owners = Array("q", lanes)
+        self._claim_lane()
+        StripedSequenceState._instances.add(self)
+
+    def _claim_lane(self):
+        # no lane until one is claimed
+        self.lock: Any = _NoLaneLock(self.lane_bits)
+        self.words = (ctypes.c_uint64 * STATE_WORDS)()
+
+        pid = os.getpid()
+        with self._owners.get_lock():
+            owners = self._owners.get_obj()  # type: ignore
+            for lane, owner in enumerate(owners):
+                if owner == 0 or (owner != pid and not _is_alive(owner)):
+                    owners[lane] = pid
+                    break
+            else:
+                return
+
+        self.lane = lane
+        self.lock = threading.Lock()
+        offset = ctypes.sizeof(ctypes.c_uint64) * STATE_WORDS * lane
+        self.words = (ctypes.c_uint64 * STATE_WORDS).from_buffer(self._words, offset)
+
+    @classmethod
+    def _after_fork(cls):
+        for state in list(cls._instances):
+            state.lock = _LaneClaimLock(state)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=StripedSequenceState._after_fork)
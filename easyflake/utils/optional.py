@@ -0,0 +1,30 @@
+__all__ = [
+    "import_numpy",
+    "import_redis",
+]
+
+
+def import_numpy():
+    """
+    Import NumPy, which is an optional dependency.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "NumPy is required for this feature. Install it by `pip install easyflake[numpy]`."
+        )
+    return numpy
+
+
+def import_redis():
+    """
+    Import redis-py, which is an optional dependency.
+    """
+    try:
+        import redis
+    except ImportError:
+        raise ImportError(
+            "redis is required for this feature. Install it by `pip install easyflake[redis]`."
+        )
+    return redis
@@ -0,0 +1,69 @@
+import abc
+import functools
+import time
+from typing import Optional
+
+from easyflake.clock import BaseClock
+
+__all__ = [
+    "BaseWaitStrategy",
+    "SleepWait",
+    "SpinWait",
+    "HybridWait",
+]
+
+
+class BaseWaitStrategy(abc.ABC):
+    """How `TimeSequenceProvider` waits for the next tick when the sequence is exhausted."""
+
+    @abc.abstractmethod
+    def wait(self, clock: BaseClock, current: int, future: int):
+        """Wait from the tick `current` until the tick `future` of `clock`."""
+
+
+class SleepWait(BaseWaitStrategy):
+    """Always sleep. The OS may round a short sleep up to tens of microseconds or more."""
+
+    def wait(self, clock: BaseClock, current: int, future: int):
+        clock.sleep(current, future)
+
+
+class SpinWait(BaseWaitStrategy):
+    """Always busy-wait. It is precise, but keeps a CPU busy while waiting."""
+
+    def wait(self, clock: BaseClock, current: int, future: int):
+        clock.spin(future)
+
+
+class HybridWait(BaseWaitStrategy):
+    def __init__(self, threshold: Optional[float] = None):
+        """
+        Busy-wait for waits shorter than `threshold`, and sleep for longer ones.
+
+        Args:
+            threshold (float): The threshold in seconds. Defaults to the shortest sleep
+                               this system can actually perform, which is calibrated once
+                               per process.
+        """
+        if threshold is None:
+            threshold = calibrate_sleep()
+        self.threshold_ns = int(threshold * 1_000_000_000)
+
+    def wait(self, clock: BaseClock, current: int, future: int):
+        if (future - current) * clock.tick_ns < self.threshold_ns:
+            clock.spin(future)
+        else:
+            clock.sleep(current, future)
+
+
+@functools.lru_cache(maxsize=None)
+def calibrate_sleep(samples: int = 5) -> float:
+    """
+    Measure the actual duration of the shortest sleep in seconds.
+    """
+    durations = []
+    for _ in range(samples):
+        start = time.perf_counter_ns()
+        time.sleep(1e-6)
+        durations.append(time.perf_counter_ns() - start)
+    return max(durations) / 1_000_000_000
@@ -1,6 +1,20 @@
+import asyncio
+import multiprocessing
+import sys
+import threading
+import time
+
 import pytest
 
-from easyflake.node.base import INVALID_VALUE, NodeIdPool
+from easyflake import EasyFlake
+from easyflake.exceptions import LeaseExpiredError
+from easyflake.node.base import (
+    INVALID_VALUE,
+    ForkPolicy,
+    Lease,
+    ListenerMode,
+    NodeIdPool,
+)
 
 
 @pytest.fixture
@@ -51,6 +65,38 @@ def test_NodeIdPool_get(infinite_pool_class):
     assert pool.get() == 1
 
 
+@pytest.mark.asyncio
+async def test_NodeIdPool_aget(infinite_pool_class):
+    pool = infinite_pool_class(1)
+    assert await pool.aget() == 1
+
+
+@pytest.mark.asyncio
+async def test_NodeIdPool_aget_timeout(mocker, infinite_pool_class):
+    mocker.patch("multiprocessing.synchronize.Event.is_set", return_value=False)
+    mocker.patch("multiprocessing.synchronize.Event.wait", return_value=False)
+
+    pool = infinite_pool_class(1)
+    mocker.patch.object(pool, "start")
+    with pytest.raises(TimeoutError):
+        await pool.aget()
+
+
+def test_NodeIdPool_generation(infinite_pool_class):
+    pool = infinite_pool_class(1)
+    generation = pool.generation
+
+    pool._node_id = 1
+    assert pool.generation != generation, "generation should be changed by new node ID"
+
+    generation = pool.generation
+    pool._node_id = 1
+    assert pool.generation == generation, "generation should be kept by the same node ID"
+
+    pool.stop()
+    assert pool.generation != generation, "generation should be changed by stop"
+
+
 def test_NodeIdPool_get_timeout(mocker, infinite_pool_class):
     mocker.patch("multiprocessing.synchronize.Event.wait", return_value=False)
 
@@ -103,3 +149,234 @@ def test_NodeIdPool_start_already_started(mocker, infinite_pool_class):
     pool.start()
 
     process_mock.assert_not_called()
+
+
+class CountingNodeIdPool(NodeIdPool):
+    """Each listener gets the next node ID."""
+
+    listeners = multiprocessing.Value("q", 0)
+
+    def listen(self):
+        with self.listeners.get_lock():
+            self.listeners.value += 1
+            node_id = self.listeners.value
+        while True:
+            yield node_id
+
+
+@pytest.fixture
+def counting_pool_class():
+    CountingNodeIdPool.listeners.value = 0
+    yield CountingNodeIdPool
+    for pool in CountingNodeIdPool.__singleton_instances__.values():
+        pool.stop()
+    CountingNodeIdPool.__singleton_instances__ = {}
+
+
+def _send_result(conn, func):
+    try:
+        conn.send(func())
+    except Exception as e:
+        conn.send(repr(e))
+
+
+def _run_in_child(func):
+    # the function is inherited by fork without pickling
+    ctx = multiprocessing.get_context("fork")
+    conn, child_conn = ctx.Pipe()
+    # not daemonic, as the child may start a listener
+    process = ctx.Process(target=_send_result, args=(child_conn, func))
+    process.start()
+    result = conn.recv()
+    process.join()
+    return result
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_NodeIdPool_fork_renew(counting_pool_class):
+    pool = counting_pool_class("endpoint", 10, on_fork="renew")
+    assert pool.on_fork == ForkPolicy.RENEW
+    ef = EasyFlake(node_id=pool, node_id_bits=10)
+    assert ef.node_id == 1
+
+    assert _run_in_child(lambda: ef.node_id) == 2, "child should acquire a new node ID"
+    assert _run_in_child(lambda: ef.decode(ef.get_id()).node_id) == 3
+    assert ef.node_id == 1, "parent should keep its node ID"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_NodeIdPool_fork_share(counting_pool_class):
+    pool = counting_pool_class("endpoint", 10, on_fork=ForkPolicy.SHARE)
+    ef = EasyFlake(node_id=pool, node_id_bits=10)
+    assert ef.node_id == 1
+
+    def get_node_id_and_stop():
+        node_id = ef.node_id
+        pool.stop()
+        return node_id
+
+    assert _run_in_child(get_node_id_and_stop) == 1, "child should share the node ID"
+    assert pool._listener.is_alive(), "child should not stop the listener of the parent"
+    assert ef.node_id == 1
+
+
+def test_NodeIdPool_fork_default(counting_pool_class):
+    pool = counting_pool_class("endpoint", 10)
+    assert pool.on_fork is None
+    assert pool not in NodeIdPool._instances
+
+
+class ModeNodeIdPool(ConcreteNodeIdInfinitePool):
+    def __init__(self, sequence: int, listener: str):
+        self._sequence = sequence
+        NodeIdPool.__init__(self, "endpoint", 10, listener=listener)
+
+
+@pytest.fixture
+def mode_pool_class():
+    yield ModeNodeIdPool
+    for pool in ModeNodeIdPool.__singleton_instances__.values():
+        pool.stop()
+    ModeNodeIdPool.__singleton_instances__ = {}
+
+
+def test_NodeIdPool_thread_listener(mocker, mode_pool_class):
+    process_mock = mocker.patch("multiprocessing.Process")
+    pool = mode_pool_class(3, "thread")
+    assert pool.listener == ListenerMode.THREAD
+
+    assert pool.get() == 3
+    process_mock.assert_not_called()
+    assert isinstance(pool._listener, threading.Thread)
+
+    generation = pool.generation
+    pool.stop()
+    assert pool.generation != generation
+    assert pool._listener is None
+
+
+@pytest.mark.asyncio
+async def test_NodeIdPool_asyncio_listener(mocker, mode_pool_class):
+    process_mock = mocker.patch("multiprocessing.Process")
+    pool = mode_pool_class(3, "asyncio")
+
+    assert await pool.aget() == 3
+    assert pool.get() == 3, "get is available once the node ID is acquired"
+    process_mock.assert_not_called()
+    assert isinstance(pool._listener, asyncio.Task)
+
+    task = pool._listener
+    pool.stop()
+    await asyncio.wait([task], timeout=1)
+    assert task.done()
+
+
+def test_NodeIdPool_asyncio_listener_restarted(lease_pool_class):
+    pool = lease_pool_class([0.2], timeout=1, listener="asyncio")
+    assert asyncio.run(pool.aget()) == 7
+    assert pool._listener is None, "the listener should end with its event loop"
+    assert not pool._running_event.is_set()
+
+    # the lease has expired, and is renewed by a listener of the next loop
+    time.sleep(0.3)
+    pool._lifespans = [60]
+    assert asyncio.run(pool.aget()) == 7
+    assert pool.lease_expiry > time.monotonic() + 50
+
+
+def test_NodeIdPool_asyncio_listener_without_loop(mode_pool_class):
+    pool = mode_pool_class(3, "asyncio")
+    with pytest.raises(RuntimeError):
+        pool.get()
+
+
+def test_NodeIdPool_share_requires_process_listener():
+    with pytest.raises(ValueError):
+        CountingNodeIdPool("endpoint", 10, on_fork="share", listener="thread")
+
+
+class LeaseNodeIdPool(NodeIdPool):
+    def __init__(self, lifespans: list, timeout: float, listener: str = "thread"):
+        self._lifespans = lifespans
+        NodeIdPool.__init__(self, "endpoint", 10, timeout=timeout, listener=listener)
+
+    def listen(self):
+        for lifespan in self._lifespans:
+            yield Lease(7, time.monotonic() + lifespan)
+        while True:
+            yield None
+
+
+@pytest.fixture
+def lease_pool_class():
+    yield LeaseNodeIdPool
+    for pool in LeaseNodeIdPool.__singleton_instances__.values():
+        pool.stop()
+    LeaseNodeIdPool.__singleton_instances__ = {}
+
+
+def test_NodeIdPool_lease(mocker, lease_pool_class):
+    pool = lease_pool_class([60], timeout=1)
+    assert pool.get() == 7
+    assert pool.lease_expiry > time.monotonic() + 50
+
+    # a fresh lease is read without waiting for the listener
+    pool._value_event = mocker.Mock()
+    assert pool.get() == 7
+    pool._value_event.wait.assert_not_called()
+
+
+def test_NodeIdPool_lease_expired(lease_pool_class):
+    pool = lease_pool_class([-1], timeout=0.1)
+    with pytest.raises(LeaseExpiredError) as e:
+        pool.get()
+    assert e.value.node_id == 7
+    assert str(e.value) == "The lease of node ID 7 has expired."
+
+
+@pytest.mark.asyncio
+async def test_NodeIdPool_lease_renewed(mocker, lease_pool_class):
+    mocker.patch.object(LeaseNodeIdPool, "refresh_rate", 0.01)
+    pool = lease_pool_class([-1, 60], timeout=1)
+    assert await pool.aget() == 7, "the node ID is returned once the lease is renewed"
+    assert pool.lease_expiry > time.monotonic()
+
+    pool.stop()
+    assert pool.lease_expiry == 0.0
+
+
+class CountingListenerPool(NodeIdPool):
+    def __init__(self):
+        self._listeners = 0
+        NodeIdPool.__init__(self, "endpoint", 10, listener="thread")
+
+    def listen(self):
+        # each listener is given its own node ID
+        self._listeners += 1
+        node_id = self._listeners
+        while True:
+            yield node_id
+
+
+@pytest.fixture
+def counting_listener_pool_class():
+    yield CountingListenerPool
+    for pool in CountingListenerPool.__singleton_instances__.values():
+        pool.stop()
+    CountingListenerPool.__singleton_instances__ = {}
+
+
+def test_NodeIdPool_thread_listener_restarted(mocker, counting_listener_pool_class):
+    mocker.patch.object(CountingListenerPool, "refresh_rate", 0.01)
+    pool = counting_listener_pool_class()
+    assert pool.get() == 1
+    old_listener = pool._listener
+
+    pool.stop()
+    assert pool.get() == 2
+    old_listener.join(timeout=1)
+    assert not old_listener.is_alive(), "the stopped listener should end"
+
+    time.sleep(0.05)
+    assert pool.get() == 2
+    assert pool._listener.is_alive()
@@ -62,7 +62,7 @@ def test_NodeIdPool_listen(mocker, target_class, open_mock_10bits, lock_file_moc
     pool = target_class("file", bits)
 
     data_iter = pool.listen()
-    assert next(data_iter) == expected_sequence
+    assert next(data_iter).node_id == expected_sequence
 
     written_lines = [*existing_lines_10bits[:-1], f"{bits}:{expected_sequence}:{current+LIFESPAN}"]
     written_data = os.linesep.join(written_lines)
@@ -80,7 +80,7 @@ def test_NodeIdPool_listen_update(mocker, target_class, open_mock_10bits, lock_f
     # current
     mocker.patch("time.time", return_value=current)
 
-    assert next(pool) == expected_sequence
+    assert next(pool).node_id == expected_sequence
 
     updated_written_lines = [
         *existing_lines_10bits[:-1],
@@ -95,7 +95,7 @@ def test_NodeIdPool_listen_update(mocker, target_class, open_mock_10bits, lock_f
     mocker.patch("time.time", return_value=expire)
     mocker.patch("time.sleep")
 
-    assert next(pool) == expected_sequence
+    assert next(pool).node_id == expected_sequence
 
     updated_written_lines = [
         *existing_lines_10bits[:1],
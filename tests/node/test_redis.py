@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from easyflake.node.base import Lease
+from easyflake.node.redis import LIFESPAN, NodeIdPool, _Server, _Servers, node_key
+
+fakeredis = pytest.importorskip("fakeredis")
+# fakeredis runs Lua scripts with lupa
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+def server(mocker):
+    server = _Server(fakeredis.FakeRedis(decode_responses=True))
+    mocker.patch.object(_Servers, "get", return_value=server)
+    return server
+
+
+@pytest.fixture
+def target_class():
+    yield NodeIdPool
+    NodeIdPool.__singleton_instances__ = {}
+
+
+def _expire_soon(server: _Server):
+    # the leases are renewed at the next heartbeat
+    for lease in server._leases.values():
+        lease.expires_at = time.monotonic()
+
+
+def test_NodeIdPool_listen(server, target_class):
+    first = target_class("redis://localhost", 1).listen()
+
+    lease = next(first)
+    assert lease == Lease(0, lease.expires_at)
+    assert lease.expires_at <= time.monotonic() + LIFESPAN
+    assert server.client.get(node_key(1, 0)) is not None
+    assert 0 < server.client.pttl(node_key(1, 0)) <= LIFESPAN * 1000
+
+    assert next(first) == lease, "a fresh lease should not be renewed"
+    _expire_soon(server)
+    assert next(first).expires_at > lease.expires_at
+
+    second = target_class("redis://localhost", 1, timeout=2).listen()
+    assert next(second).node_id == 1
+    assert next(target_class("redis://localhost", 1, timeout=3).listen()) is None
+
+    # the node ID is released when the listener is closed
+    first.close()
+    assert server.client.get(node_key(1, 0)) is None
+    assert next(target_class("redis://localhost", 1, timeout=4).listen()).node_id == 0
+
+
+def test_NodeIdPool_listen_lost(server, target_class):
+    listener = target_class("redis://localhost", 2).listen()
+    assert next(listener).node_id == 0
+
+    # the key expired and was claimed by another pool
+    server.client.set(node_key(2, 0), "other")
+    _expire_soon(server)
+    assert next(listener).node_id == 1
+
+
+def test_NodeIdPool_pipelined_renewals(mocker, server, target_class):
+    listeners = [target_class("redis://localhost", 2, timeout=t).listen() for t in (1, 2, 3)]
+    assert [next(listener).node_id for listener in listeners] == [0, 1, 2]
+
+    pipeline = mocker.spy(server.client, "pipeline")
+    _expire_soon(server)
+    leases = [next(listener) for listener in listeners]
+    pipeline.assert_called_once()
+    assert len({lease.expires_at for lease in leases}) == 1, "renewed in one round trip"
+
+
+def test_NodeIdPool_claim_batches(mocker, server, target_class):
+    mocker.patch("easyflake.node.redis.CLAIM_BATCH", 2)
+    claim = mocker.spy(server, "claim")
+    listeners = [target_class("redis://localhost", 2, timeout=t).listen() for t in (1, 2, 3)]
+    assert [next(listener).node_id for listener in listeners] == [0, 1, 2]
+
+    # each call of the script is given the keys of a batch
+    assert all(len(call.kwargs["keys"]) == 2 for call in claim.call_args_list)
+    assert claim.call_args_list[-1].kwargs["keys"] == [node_key(2, 2), node_key(2, 3)]
@@ -0,0 +1,140 @@
+import multiprocessing
+import sys
+import time
+
+import pytest
+
+from easyflake.node.base import Lease
+from easyflake.node.slot import HEADER, LIFESPAN, SLOT, NodeIdPool, SlotFile
+
+# slots are locked by fcntl, which is POSIX only
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+
+
+@pytest.fixture
+def target_class():
+    yield NodeIdPool
+    NodeIdPool.__singleton_instances__ = {}
+
+
+def test_SlotFile(tmp_path):
+    path = str(tmp_path / "slots")
+    first = SlotFile(path, 1)
+    second = SlotFile(path, 1)
+    assert (tmp_path / "slots").stat().st_size == HEADER.size + SLOT.size * 2
+
+    expire = time.time() + LIFESPAN
+    first_id = first.claim(1, expire)
+    node_id = second.claim(2, expire)
+    assert {first_id, node_id} == {0, 1}
+    assert first.claim(3, expire) is None, "no slot should be left"
+
+    # a slot is renewed only by its owner
+    assert first.renew(first_id, 1, expire)
+    assert not first.renew(node_id, 1, expire)
+    assert second.renew(node_id, 2, expire)
+
+    # a released slot is claimed again
+    second.release(node_id, 2)
+    assert first.claim(3, expire) == node_id
+
+    first.close()
+    second.close()
+
+
+def _try_lock(conn, slot_file: SlotFile):
+    lock = slot_file._lock(0)
+    conn.send(lock.acquire(False))
+
+
+def test_SlotFile_shared_descriptor(tmp_path):
+    path = str(tmp_path / "slots")
+    first = SlotFile(path, 1)
+    second = SlotFile(path, 1)
+    assert first._fd == second._fd, "the file should be opened once in a process"
+
+    # closing a slot file must not release the locks of the other one
+    with second._lock(0):
+        first.close()
+        ctx = multiprocessing.get_context("fork")
+        conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=_try_lock, args=(child_conn, second))
+        process.start()
+        assert conn.recv() is False, "the slot should still be locked"
+        process.join()
+
+    assert second.claim(1, time.time() + LIFESPAN) is not None
+    second.close()
+    second.close()
+    assert path not in SlotFile._files
+
+
+def test_SlotFile_expired(tmp_path):
+    slot_file = SlotFile(str(tmp_path / "slots"), 1)
+    now = time.time()
+    assert slot_file.claim(1, now - 1) is not None
+    assert slot_file.claim(2, now + LIFESPAN) is not None
+    assert slot_file.claim(3, now + LIFESPAN) is not None, "an expired slot should be claimed"
+    assert slot_file.claim(4, now + LIFESPAN) is None
+    slot_file.close()
+
+
+def test_SlotFile_invalid(tmp_path):
+    path = str(tmp_path / "slots")
+    SlotFile(path, 2).close()
+    with pytest.raises(ValueError):
+        SlotFile(path, 3)
+
+    (tmp_path / "other").write_text("10:0:0")
+    with pytest.raises(ValueError):
+        SlotFile(str(tmp_path / "other"), 2)
+
+
+def test_NodeIdPool_listen(tmp_path, target_class):
+    path = str(tmp_path / "slots")
+    first = target_class(path, 1).listen()
+    second = target_class(path, 2).listen()
+
+    lease = next(first)
+    assert isinstance(lease, Lease)
+    assert lease.expires_at <= time.monotonic() + LIFESPAN
+    assert next(first).node_id == lease.node_id, "the slot should be renewed"
+
+    with pytest.raises(ValueError):
+        next(second)
+
+    # the slot is released when the listener is closed
+    first.close()
+    assert next(target_class(path, 1, timeout=4).listen()).node_id is not None
+
+
+def test_NodeIdPool_listen_exhausted(tmp_path, target_class):
+    path = str(tmp_path / "slots")
+    listeners = [target_class(path, 1, timeout=t).listen() for t in (1, 2, 3)]
+    leases = [next(listener) for listener in listeners]
+    assert sorted(lease.node_id for lease in leases[:2]) == [0, 1]
+    assert leases[2] is None
+
+
+def _claim(conn, path: str):
+    slot_file = SlotFile(path, 4)
+    expire = time.time() + LIFESPAN
+    conn.send([slot_file.claim(pid, expire) for pid in range(1, 5)])
+
+
+def test_SlotFile_claimed_by_processes(tmp_path):
+    path = str(tmp_path / "slots")
+    ctx = multiprocessing.get_context("fork")
+    connections = []
+    processes = []
+    for _ in range(4):
+        conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=_claim, args=(child_conn, path))
+        process.start()
+        connections.append(conn)
+        processes.append(process)
+
+    node_ids = [i for conn in connections for i in conn.recv()]
+    for process in processes:
+        process.join()
+    assert sorted(node_ids) == list(range(16)), "each slot should be claimed once"
@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+from easyflake.node.base import Lease
+from easyflake.node.sqlite import LIFESPAN, TABLE, LeaseTable, NodeIdPool
+
+
+@pytest.fixture
+def target_class():
+    yield NodeIdPool
+    NodeIdPool.__singleton_instances__ = {}
+
+
+def test_LeaseTable(tmp_path):
+    path = str(tmp_path / "node_ids.db")
+    first = LeaseTable(path, 1, 1)
+    second = LeaseTable(path, 1, 1)
+
+    expire = time.time() + LIFESPAN
+    assert first.claim(1, expire) == 0, "the lowest node ID should be claimed"
+    assert second.claim(2, expire) == 1
+    assert first.claim(3, expire) is None, "no node ID should be left"
+
+    # a node ID is renewed only by its owner
+    assert first.renew(0, 1, expire)
+    assert not first.renew(1, 1, expire)
+
+    # a released node ID is claimed again
+    second.release(1, 2)
+    assert first.claim(3, expire) == 1
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert conn.execute(f"SELECT node_id, token FROM {TABLE}").fetchall() == [(0, 1), (1, 3)]
+
+    first.close()
+    second.close()
+
+
+def test_LeaseTable_expired(tmp_path):
+    table = LeaseTable(str(tmp_path / "node_ids.db"), 1, 1)
+    now = time.time()
+    assert table.claim(1, now + LIFESPAN) == 0
+    assert table.claim(2, now - 1) == 1
+    assert table.claim(3, now + LIFESPAN) == 1, "an expired node ID should be claimed"
+    assert not table.renew(1, 2, now + LIFESPAN)
+    table.close()
+
+
+def test_LeaseTable_bits(tmp_path):
+    path = str(tmp_path / "node_ids.db")
+    expire = time.time() + LIFESPAN
+    small = LeaseTable(path, 1, 1)
+    large = LeaseTable(path, 2, 1)
+    assert [small.claim(t, expire) for t in (1, 2, 3)] == [0, 1, None]
+    assert [large.claim(t, expire) for t in (4, 5, 6, 7, 8)] == [0, 1, 2, 3, None]
+    small.close()
+    large.close()
+
+
+def test_LeaseTable_setup_retried(mocker, tmp_path):
+    transaction = LeaseTable._transaction
+    calls = []
+
+    def busy_once(table):
+        # the database is being set up by another process
+        calls.append(table)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return transaction(table)
+
+    mocker.patch.object(LeaseTable, "_transaction", autospec=True, side_effect=busy_once)
+    table = LeaseTable(str(tmp_path / "node_ids.db"), 1, 1)
+    assert table.claim(1, time.time() + LIFESPAN) == 0
+    assert len(calls) == 3, "the setup should be retried"
+    table.close()
+
+
+def test_LeaseTable_setup_timeout(mocker, tmp_path):
+    mocker.patch("easyflake.node.sqlite.SETUP_RETRY_INTERVAL", 0)
+    mocker.patch.object(LeaseTable, "_transaction", side_effect=sqlite3.OperationalError)
+    with pytest.raises(sqlite3.OperationalError):
+        LeaseTable(str(tmp_path / "node_ids.db"), 1, 0.05)
+
+
+def test_NodeIdPool_listen(tmp_path, target_class):
+    path = str(tmp_path / "node_ids.db")
+    first = target_class(path, 1).listen()
+
+    lease = next(first)
+    assert lease == Lease(0, lease.expires_at)
+    assert lease.expires_at <= time.monotonic() + LIFESPAN
+    assert next(first).node_id == 0, "the node ID should be renewed"
+
+    second = target_class(path, 1, timeout=2).listen()
+    assert next(second).node_id == 1
+    assert next(target_class(path, 1, timeout=3).listen()) is None
+
+    # the node ID is released when the listener is closed
+    first.close()
+    assert next(target_class(path, 1, timeout=4).listen()).node_id == 0
+
+
+def _claim(conn, path: str):
+    table = LeaseTable(path, 4, 5)
+    expire = time.time() + LIFESPAN
+    tokens = [os.getpid() << 2 | i for i in range(4)]
+    conn.send([table.claim(token, expire) for token in tokens])
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_LeaseTable_claimed_by_processes(tmp_path):
+    path = str(tmp_path / "node_ids.db")
+    ctx = multiprocessing.get_context("fork")
+    connections = []
+    processes = []
+    for _ in range(4):
+        conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=_claim, args=(child_conn, path))
+        process.start()
+        connections.append(conn)
+        processes.append(process)
+
+    node_ids = [i for conn in connections for i in conn.recv()]
+    for process in processes:
+        process.join()
+    assert sorted(node_ids) == list(range(16)), "each node ID should be claimed once"
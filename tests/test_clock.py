@@ -3,7 +3,13 @@ from unittest.mock import patch
 
 import pytest
 
-from easyflake.clock import ScaledClock, TimeScale
+from easyflake.clock import (
+    CoarseClock,
+    MonotonicClock,
+    ScaledClock,
+    SimulatedClock,
+    TimeScale,
+)
 
 base_datetime = datetime(1970, 1, 1, 0, 1, 1, 234567, tzinfo=timezone.utc)
 diff_from_epoch = 61_23
@@ -53,3 +59,138 @@ def test_sleep():
         clock = ScaledClock(TimeScale.MILLI, 0)
         clock.sleep(0, 3)
         sleep_mock.assert_called_once_with(0.003)
+
+        # the clock may have passed the tick
+        clock.sleep(5, 3)
+        sleep_mock.assert_called_with(0)
+
+
+def test_tick_duration(mocker):
+    mocker.patch("time.time_ns", return_value=61_234_567_000)
+    clock = ScaledClock(timedelta(milliseconds=10), 1)
+    assert clock.tick_ns == 10_000_000
+    assert clock.epoch == 100
+    assert clock.current() == 6023
+    assert clock.future(timedelta(seconds=1, milliseconds=19)) == 6124
+
+    # 2^10 microseconds
+    clock = ScaledClock(timedelta(microseconds=1024), 0)
+    assert clock.current() == 61_234_567_000 // 1_024_000
+    assert clock.to_unix_ns(1) == 1_024_000
+
+    with patch("time.sleep") as sleep_mock:
+        clock.sleep(0, 3)
+        sleep_mock.assert_called_once_with(0.003072)
+
+
+@pytest.mark.parametrize("clock_class", [ScaledClock, MonotonicClock, SimulatedClock])
+def test_invalid_tick_duration(clock_class):
+    with pytest.raises(ValueError):
+        clock_class(timedelta(0), 0)
+
+
+@pytest.fixture
+def time_ns_mock(mocker):
+    # the monotonic clock starts at 1000ns when the wall clock is 00:01:01.234567
+    mocker.patch("time.time_ns", return_value=61_234_567_000)
+    return mocker.patch("time.monotonic_ns", return_value=1000)
+
+
+def test_MonotonicClock_invalid_arguments():
+    with pytest.raises(ValueError):
+        MonotonicClock(TimeScale.SECOND - 1, 0)
+    with pytest.raises(ValueError):
+        MonotonicClock(TimeScale.MICRO + 1, 0)
+
+
+def test_MonotonicClock_current(time_ns_mock):
+    clock = MonotonicClock(TimeScale.MICRO, 1)
+    assert clock.current() == 60_234_567, "micro seconds should be exact"
+    assert clock.epoch == 1_000_000
+
+    # the wall clock is not referred after the clock is created
+    time_ns_mock.return_value = 1000 + 1_000_000_000
+    assert clock.current() == 61_234_567
+
+
+def test_MonotonicClock_future(time_ns_mock):
+    clock = MonotonicClock(2, 0)
+    delta = timedelta(hours=1, microseconds=123456)
+    assert clock.future(delta) == 3600_12 + diff_from_epoch
+
+
+def test_MonotonicClock_tick_duration(time_ns_mock):
+    clock = MonotonicClock(timedelta(milliseconds=10), 1)
+    assert clock.current() == 6023
+    assert clock.epoch == 100
+
+
+def test_MonotonicClock_unaligned_epoch(time_ns_mock):
+    # the epoch 00:00:01 is not a multiple of 7 milliseconds
+    clock = MonotonicClock(timedelta(milliseconds=7), 1)
+    assert clock.epoch == 142
+    assert clock.current() == 61_234 // 7 - 142
+    assert clock.from_unix_ns(61_234_567_000) == clock.current()
+    assert (
+        clock.to_unix_ns(clock.current()) <= 61_234_567_000 < clock.to_unix_ns(clock.current() + 1)
+    )
+    assert clock.current() == ScaledClock(timedelta(milliseconds=7), 1).current()
+
+
+def test_MonotonicClock_sleep():
+    with patch("time.sleep") as sleep_mock:
+        clock = MonotonicClock(TimeScale.MILLI, 0)
+        clock.sleep(0, 3)
+        sleep_mock.assert_called_once_with(0.003)
+
+
+def test_CoarseClock_current():
+    clock = CoarseClock(TimeScale.MILLI, 0, interval=0.001)
+    expected = MonotonicClock(TimeScale.MILLI, 0).current()
+    assert abs(clock.current() - expected) <= 10, "coarse clock should follow the clock"
+
+    with patch("time.monotonic_ns") as monotonic_ns_mock:
+        clock.current()
+    monotonic_ns_mock.assert_not_called()
+
+
+def test_CoarseClock_sleep():
+    clock = CoarseClock(TimeScale.MILLI, 0, interval=60)
+    current = clock.current()
+    clock.sleep(current, current + 2)
+    assert clock.current() >= current + 2, "clock should be refreshed after sleep"
+
+
+def test_CoarseClock_spin():
+    clock = CoarseClock(TimeScale.MICRO, 0, interval=60)
+    future = clock.current() + 100
+    clock.spin(future)
+    assert clock.current() >= future, "clock should be refreshed after spin"
+
+
+def test_CoarseClock_monotonic():
+    clock = CoarseClock(TimeScale.MILLI, 0, interval=60)
+    current = clock.current()
+    clock._advance(current + 5)
+
+    # an older reading of the refresh thread
+    clock._advance(current)
+    assert clock.current() == current + 5, "coarse clock should not move backwards"
+
+
+def test_SimulatedClock():
+    clock = SimulatedClock(TimeScale.MILLI, 1, start=100)
+    assert clock.current() == 100
+    assert clock.epoch == 1000
+    assert clock.future(timedelta(seconds=1)) == 1100
+
+    with patch("time.sleep") as sleep_mock:
+        clock.sleep(100, 105)
+    sleep_mock.assert_not_called()
+    assert clock.current() == 105, "sleep should advance the virtual time"
+
+    clock.spin(107)
+    assert clock.current() == 107, "spin should advance the virtual time"
+
+    clock.advance(-3)
+    assert clock.current() == 104
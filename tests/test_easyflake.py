@@ -1,8 +1,11 @@
-from datetime import timedelta
+import uuid
+from array import array
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
-from easyflake import EasyFlake, TimeScale
+from easyflake import DecodedId, EasyFlake, SimulatedClock, TimeScale
+from easyflake.exceptions import ClockRollbackError
 from easyflake.node.base import NodeIdPool
 from easyflake.sequence import TimeSequence
 
@@ -14,8 +17,8 @@ def test_get_id(mocker):
 
     ef = EasyFlake(node_id=node_id, node_id_bits=10, sequence_bits=9)
     mocker.patch(
-        "easyflake.sequence.TimeSequenceProvider.next",
-        return_value=sequence,
+        "easyflake.sequence.TimeSequenceProvider.next_raw",
+        return_value=(sequence.timestamp, sequence.value),
     )
     expected_id = timestamp << 19 | node_id << 9 | sequence.value
     actual_id = ef.get_id()
@@ -29,13 +32,14 @@ def test_get_id_with_node_id_provider(mocker):
     sequence = TimeSequence(timestamp=timestamp, value=789)
 
     pool = mocker.patch("easyflake.node.base.NodeIdPool", spec=NodeIdPool)
+    pool.bits = 10
     pool.get.return_value = node_id
 
     ef = EasyFlake(node_id=pool, node_id_bits=10, sequence_bits=9)
 
     mocker.patch(
-        "easyflake.sequence.TimeSequenceProvider.next",
-        return_value=sequence,
+        "easyflake.sequence.TimeSequenceProvider.next_raw",
+        return_value=(sequence.timestamp, sequence.value),
     )
     expected_id = timestamp << 19 | node_id << 9 | sequence.value
     actual_id = ef.get_id()
@@ -43,6 +47,325 @@ def test_get_id_with_node_id_provider(mocker):
     assert actual_id == expected_id, msg
 
 
+def test_node_id_cache(mocker):
+    pool = mocker.MagicMock(spec=NodeIdPool)
+    pool.bits = 4
+    pool.generation = 1
+    pool.lease_expiry = float("inf")
+    pool.get.return_value = 3
+
+    ef = EasyFlake(node_id=pool, node_id_bits=4, sequence_bits=4)
+    ef.get_id()
+    ef.get_id()
+    pool.get.assert_called_once()
+
+    # reassigned node ID
+    pool.generation = 2
+    pool.get.return_value = 4
+    assert ef.get_id() >> 4 & 0b1111 == 4
+    assert pool.get.call_count == 2
+
+    # the node ID is asked again when its lease expires
+    monotonic = mocker.patch("time.monotonic", return_value=50.0)
+    pool.generation = 3
+    pool.lease_expiry = 100.0
+    ef.get_id()
+    ef.get_id()
+    assert pool.get.call_count == 3
+    monotonic.return_value = 100.0
+    ef.get_id()
+    assert pool.get.call_count == 4
+
+    # node ID out of range
+    pool.generation = 4
+    pool.get.return_value = 16
+    with pytest.raises(ValueError):
+        ef.get_id()
+
+
+def test_lazy_node_id(mocker):
+    pool = mocker.MagicMock(spec=NodeIdPool)
+    pool.bits = 4
+    pool.generation = 1
+    pool.get.return_value = 16
+
+    ef = EasyFlake(node_id=pool, node_id_bits=4, sequence_bits=4)
+    pool.start.assert_called_once()
+    pool.get.assert_not_called()
+
+    # the node ID is checked when it is acquired
+    with pytest.raises(ValueError):
+        ef.get_id()
+
+    pool = mocker.MagicMock(spec=NodeIdPool)
+    pool.bits = 4
+    EasyFlake(node_id=pool, node_id_bits=4, sequence_bits=4, start_node_id_pool=False)
+    pool.start.assert_not_called()
+    pool.get.assert_not_called()
+
+    pool.bits = 5
+    with pytest.raises(ValueError) as exc_info:
+        EasyFlake(node_id=pool, node_id_bits=4, sequence_bits=4)
+    assert "node_id_bits" in str(exc_info.value)
+
+
+def test_get_ids(mocker):
+    now = [1675859040.0]
+
+    def sleep(seconds):
+        now[0] += seconds or 0.001
+
+    mocker.patch("time.time", side_effect=lambda: now[0])
+    mocker.patch("time.sleep", side_effect=sleep)
+
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=2)
+    ids = ef.get_ids(10)
+
+    now[0] = 1675859040.0
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=2)
+    expected = [ef.get_id() for _ in range(10)]
+
+    assert ids == expected, "get_ids should be the same as calling get_id repeatedly"
+    assert len(set(ids)) == 10
+
+
+def test_get_ids_as_array():
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=8)
+    ids = ef.get_ids(300, as_array=True)
+
+    assert isinstance(ids, array)
+    assert ids.typecode == "Q"
+    assert list(ids) == sorted(set(ids)), "IDs should be unique and ordered"
+
+
+def test_get_id_with_simulated_clock():
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=1, node_id_bits=4, sequence_bits=2, clock=clock, rollback_policy="raise")
+
+    # overflow of the sequence advances the virtual time
+    ids = [ef.get_id() for _ in range(10)]
+    assert [i >> 6 for i in ids] == [1000] * 4 + [1001] * 4 + [1002] * 2
+
+    clock.advance(-1)
+    with pytest.raises(ClockRollbackError):
+        ef.get_id()
+    assert ef.rollback_count == 1
+
+    clock.advance(1)
+    assert ef.get_id() >> 6 == 1002
+
+
+@pytest.mark.asyncio
+async def test_aget_id(mocker):
+    pool = mocker.MagicMock(spec=NodeIdPool)
+    pool.bits = 4
+    pool.lease_expiry = float("inf")
+    pool.get.return_value = 3
+    pool.aget = mocker.AsyncMock(return_value=3)
+
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=pool, node_id_bits=4, sequence_bits=2, clock=clock)
+    pool.generation = 1
+
+    ids = [await ef.aget_id() for _ in range(5)]
+    assert [i >> 6 for i in ids] == [1000] * 4 + [1001]
+    assert {i >> 2 & 0b1111 for i in ids} == {3}
+    pool.aget.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_aget_ids():
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=2, clock=clock)
+    ids = await ef.aget_ids(10, as_array=True)
+
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=2, clock=clock)
+    assert list(ids) == [ef.get_id() for _ in range(10)]
+
+
+def test_get_ids_array():
+    np = pytest.importorskip("numpy")
+
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=2, clock=clock)
+    ef.get_id()
+    ids = ef.get_ids_array(10)
+
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=2, clock=clock)
+    ef.get_id()
+    expected = [ef.get_id() for _ in range(10)]
+
+    assert ids.dtype == np.uint64
+    assert ids.tolist() == expected, "IDs should be bit-identical to get_id"
+
+
+def test_get_ids_array_without_numpy(mocker):
+    mocker.patch.dict("sys.modules", {"numpy": None})
+    ef = EasyFlake(node_id=5)
+    with pytest.raises(ImportError) as exc_info:
+        ef.get_ids_array(10)
+    assert "easyflake[numpy]" in str(exc_info.value)
+
+
+def test_decode():
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=6, epoch=1, time_scale=TimeScale.MILLI)
+    flake_id = 1234567 << 10 | 5 << 6 | 33
+
+    expected = DecodedId(
+        timestamp=datetime(1970, 1, 1, 0, 20, 35, 567000, tzinfo=timezone.utc),
+        node_id=5,
+        sequence=33,
+    )
+    assert ef.decode(flake_id) == expected
+
+
+def test_decode_many():
+    np = pytest.importorskip("numpy")
+
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=6, epoch=1, time_scale=TimeScale.MICRO)
+    flake_ids = [1234567 << 10 | 5 << 6 | 33, 1234568 << 10 | 6 << 6 | 0]
+
+    for ids in (flake_ids, iter(flake_ids), np.array(flake_ids, dtype=np.uint64)):
+        actual = ef.decode_many(ids)
+        expected_timestamp = np.array(
+            ["1970-01-01T00:00:02.234567", "1970-01-01T00:00:02.234568"], dtype="datetime64[ns]"
+        )
+        assert (actual["timestamp"] == expected_timestamp).all()
+        assert actual["node_id"].tolist() == [5, 6]
+        assert actual["sequence"].tolist() == [33, 0]
+
+    actual = ef.decode_many(flake_ids, as_datetime=False)
+    assert actual["timestamp"].tolist() == [2_234_567_000, 2_234_568_000]
+
+
+def test_id_range():
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=6, epoch=1, time_scale=TimeScale.MILLI)
+    start = datetime(1970, 1, 1, 0, 0, 2, 500, tzinfo=timezone.utc)
+    end = datetime(1970, 1, 1, 0, 0, 3, 999999, tzinfo=timezone.utc)
+
+    min_id, max_id = ef.id_range(start, end)
+    assert min_id == 1000 << 10
+    assert max_id == (2999 << 10) | 0b1111111111
+
+    for flake_id in (min_id, max_id):
+        assert start.replace(microsecond=0) <= ef.decode(flake_id).timestamp <= end
+
+    assert ef.id_ranges([(start, end), (start, start)]) == [
+        (min_id, max_id),
+        (1000 << 10, (1000 << 10) | 0b1111111111),
+    ]
+
+    with pytest.raises(ValueError):
+        ef.id_range(end, start)
+
+
+def test_id_range_before_epoch():
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=6, epoch=10)
+    min_id, _ = ef.id_range(datetime(1970, 1, 1, tzinfo=timezone.utc), datetime.now())
+    assert min_id == 0
+
+    with pytest.raises(ValueError):
+        ef.id_range(
+            datetime(1970, 1, 1, tzinfo=timezone.utc),
+            datetime(1970, 1, 1, 0, 0, 9, tzinfo=timezone.utc),
+        )
+
+
+def test_id_range_borrow_ticks():
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=2, borrow_ticks=3, clock=clock)
+    ids = ef.get_ids(16)
+    assert ef.lead == 3
+
+    start = end = datetime(1970, 1, 1, 0, 0, 1, tzinfo=timezone.utc)
+    min_id, max_id = ef.id_range(start, end)
+    assert all(min_id <= flake_id <= max_id for flake_id in ids), "borrowed IDs are included"
+
+
+def test_codecs():
+    ef = EasyFlake(node_id=5)
+    ids = ef.get_ids(100)
+
+    for codec in (ef.base32, ef.base62, ef.binary):
+        encoded = codec.encode_many(ids)
+        assert encoded == sorted(encoded)
+        assert codec.decode_many(encoded) == ids
+        assert codec.decode(codec.encode(ids[0])) == ids[0]
+
+
+def test_wide_ids():
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1000)
+    ef = EasyFlake(node_id=1000, node_id_bits=16, sequence_bits=40, id_bits=128, clock=clock)
+    assert ef.is_wide
+
+    ids = ef.get_ids(10)
+    assert ids == sorted(set(ids))
+    assert ids[0] == (1000 << 56) | (1000 << 40)
+    assert ef.decode(ids[-1]).sequence == 9
+    assert ef.binary.decode(ef.binary.encode(ids[-1])) == ids[-1]
+    assert len(ef.binary.encode(ids[-1])) == 16
+
+    with pytest.raises(ValueError):
+        ef.get_ids(10, as_array=True)
+    with pytest.raises(ValueError):
+        ef.get_ids_array(10)
+
+
+@pytest.mark.parametrize("id_bits", [32, 100])
+def test_invalid_id_bits(id_bits):
+    with pytest.raises(ValueError) as exc_info:
+        EasyFlake(node_id=1, id_bits=id_bits)
+    assert "id_bits" in str(exc_info.value)
+
+
+def test_get_uuid():
+    clock = SimulatedClock(TimeScale.MICRO, 0, start=1_234_567)
+    ef = EasyFlake(node_id=5, node_id_bits=4, sequence_bits=6, clock=clock)
+
+    actual = ef.get_uuid()
+    assert actual.version == 7
+    assert actual.variant == uuid.RFC_4122
+    # unix_ts_ms
+    assert actual.int >> 80 == 1234
+    # sub-millisecond timestamp, node ID and sequence
+    payload = ((actual.int >> 64) & 0xFFF) << 62 | actual.int & ((1 << 62) - 1)
+    assert payload == (567 << 10) | (5 << 6) | 0
+
+    uuids = ef.get_uuids(100)
+    assert [u.bytes for u in uuids] == sorted({u.bytes for u in uuids})
+    assert actual < uuids[0]
+
+
+def test_get_uuid_too_wide():
+    clock = SimulatedClock(TimeScale.MILLI, 0, start=1)
+    ef = EasyFlake(node_id=1, node_id_bits=16, sequence_bits=60, id_bits=128, clock=clock)
+    with pytest.raises(ValueError):
+        ef.get_uuid()
+    with pytest.raises(ValueError):
+        ef.get_uuids(3)
+    assert ef.decode(ef.get_id()).sequence == 0, "no sequence value should be consumed"
+
+
+def test_tick_duration():
+    # Sonyflake-like 10ms ticks
+    ef = EasyFlake(
+        node_id=5, node_id_bits=16, sequence_bits=12, time_scale=timedelta(milliseconds=10)
+    )
+    flake_id = ef.get_id()
+    decoded = ef.decode(flake_id)
+    assert decoded.node_id == 5
+    assert decoded.timestamp.microsecond % 10_000 == 0
+    assert abs(datetime.now(timezone.utc) - decoded.timestamp) < timedelta(seconds=1)
+
+    # 2^n microseconds are too short for the layout
+    with pytest.raises(ValueError):
+        EasyFlake(
+            node_id=5, node_id_bits=16, sequence_bits=16, time_scale=timedelta(microseconds=8)
+        )
+
+
 def test_instance_critical_lifetime(mocker):
     common_args = {
         "node_id": 0,
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from easyflake.encoding import Base32Codec, Base62Codec, BytesCodec
+
+
+@pytest.fixture(params=[Base32Codec, Base62Codec, BytesCodec])
+def codec_class(request):
+    return request.param
+
+
+@pytest.mark.parametrize("bits", [8, 63, 64, 96, 128])
+def test_roundtrip(codec_class, bits):
+    codec = codec_class(bits)
+    rand = random.Random(bits)
+    values = [0, 1, (1 << bits) - 1] + [rand.getrandbits(bits) for _ in range(200)]
+
+    encoded = codec.encode_many(values)
+    assert codec.decode_many(encoded) == values
+    assert [codec.encode(v) for v in values] == encoded
+    assert [codec.decode(e) for e in encoded] == values
+    assert len({len(e) for e in encoded}) == 1, "encoded values should have a fixed width"
+
+
+@pytest.mark.parametrize("bits", [64, 128])
+def test_order(codec_class, bits):
+    codec = codec_class(bits)
+    rand = random.Random(bits)
+    values = [rand.getrandbits(rand.randint(1, bits)) for _ in range(500)]
+
+    encoded = codec.encode_many(values)
+    assert sorted(encoded) == codec.encode_many(sorted(values)), "order should be preserved"
+
+
+def test_width():
+    assert Base32Codec(64).width == 13
+    assert Base62Codec(64).width == 11
+    assert BytesCodec(64).width == 8
+
+
+def test_encode_out_of_range(codec_class):
+    codec = codec_class(64)
+    with pytest.raises(ValueError):
+        codec.encode(-1)
+    with pytest.raises(ValueError):
+        codec.encode(1 << 64)
+
+
+def test_decode_invalid():
+    with pytest.raises(ValueError):
+        Base32Codec(64).decode("0000000000000000")
+    with pytest.raises(ValueError):
+        Base32Codec(64).decode("000000000000U")
+    with pytest.raises(ValueError):
+        Base32Codec(64).decode("G000000000000")
+    with pytest.raises(ValueError):
+        Base62Codec(64).decode("0000000000-")
+    with pytest.raises(ValueError):
+        Base62Codec(64).decode("00000")
+    with pytest.raises(ValueError):
+        Base62Codec(64).decode("zzzzzzzzzzz")
+    with pytest.raises(ValueError):
+        BytesCodec(64).decode(b"\x00")
+
+
+def test_Base32Codec_normalize():
+    codec = Base32Codec(64)
+    assert codec.decode("0000000000ilo") == codec.decode("0000000000110")
+
+
+@pytest.mark.parametrize("bits", [8, 41, 63, 64])
+def test_Base62Codec_numpy(mocker, bits):
+    pytest.importorskip("numpy")
+    codec = Base62Codec(bits)
+    rand = random.Random(bits)
+    values = [0, (1 << bits) - 1] + [rand.getrandbits(bits) for _ in range(200)]
+
+    encoded = codec.encode_many(values)
+    decoded = codec.decode_many(encoded)
+    mocker.patch("easyflake.encoding.NUMPY_MIN_BATCH", len(values) + 1)
+    assert encoded == codec.encode_many(values), "should be the same as the Python path"
+    assert decoded == values
+    assert all(type(value) is int for value in decoded)
+
+
+def test_Base62Codec_numpy_invalid():
+    pytest.importorskip("numpy")
+    codec = Base62Codec(64)
+    values = list(range(100))
+    encoded = codec.encode_many(values)
+
+    for invalid in ([-1], [1 << 64]):
+        with pytest.raises(ValueError):
+            codec.encode_many(values + invalid)
+    for invalid in (["zzzzzzzzzzz"], ["0000000000-"], ["00000"], ["000000000é0"]):
+        with pytest.raises(ValueError):
+            codec.decode_many(encoded + invalid)
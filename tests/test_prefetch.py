@@ -0,0 +1,137 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from easyflake import PrefetchingEasyFlake, SimulatedClock, TimeScale
+from easyflake.node.base import NodeIdPool
+
+
+def _wait_buffered(flake: PrefetchingEasyFlake, count: int):
+    deadline = time.monotonic() + 5
+    while flake.buffered < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def clock():
+    return SimulatedClock(TimeScale.MILLI, 0, start=1000)
+
+
+def test_get_id(clock):
+    flake = PrefetchingEasyFlake(
+        node_id=1, sequence_bits=10, clock=clock, low_water=4, high_water=16
+    )
+    _wait_buffered(flake, 16)
+    assert flake.buffered == 16
+
+    ids = [flake.get_id() for _ in range(20)]
+    assert len(set(ids)) == 20, "IDs should be unique"
+    assert ids[:16] == sorted(ids[:16])
+
+    _wait_buffered(flake, 16)
+    assert flake.buffered == 16, "buffer should be refilled"
+    flake.close()
+
+
+def test_get_id_stale(clock):
+    flake = PrefetchingEasyFlake(
+        node_id=1,
+        sequence_bits=10,
+        clock=clock,
+        low_water=0,
+        high_water=8,
+        max_staleness=timedelta(milliseconds=10),
+    )
+    _wait_buffered(flake, 8)
+
+    clock.advance(11)
+    flake_id = flake.get_id()
+    assert flake_id >> 18 == 1011, "stale IDs should be discarded"
+    flake.close()
+
+
+def test_get_id_empty(clock):
+    flake = PrefetchingEasyFlake(node_id=1, clock=clock, low_water=1, high_water=2)
+    flake.close()
+    assert flake.buffered == 0
+    assert flake.get_id() >> 16 == 1000
+
+
+@pytest.mark.asyncio
+async def test_aget_id(clock):
+    flake = PrefetchingEasyFlake(node_id=1, clock=clock, low_water=1, high_water=2)
+    _wait_buffered(flake, 2)
+    first = await flake.aget_id()
+
+    flake.close()
+    assert await flake.aget_id() > first
+
+
+def test_after_fork(mocker, clock):
+    flake = PrefetchingEasyFlake(node_id=1, clock=clock, low_water=1, high_water=4)
+    _wait_buffered(flake, 4)
+
+    start_mock = mocker.patch.object(flake, "_start")
+    PrefetchingEasyFlake._after_fork()
+
+    assert flake.buffered == 0, "IDs shared with the parent process should be discarded"
+    start_mock.assert_called_once()
+    flake.close()
+
+
+@pytest.fixture
+def pool(mocker):
+    pool = mocker.MagicMock(spec=NodeIdPool)
+    pool.bits = 4
+    pool.generation = 1
+    pool.lease_expiry = time.monotonic() + 60
+    pool.get.return_value = 3
+    return pool
+
+
+def _node_ids(ids):
+    return {i >> 10 & 0b1111 for i in ids}
+
+
+def test_get_id_node_id_changed(clock, pool):
+    flake = PrefetchingEasyFlake(
+        node_id=pool, node_id_bits=4, sequence_bits=10, clock=clock, low_water=4, high_water=16
+    )
+    _wait_buffered(flake, 16)
+
+    # the node ID is reassigned
+    pool.generation = 2
+    pool.get.return_value = 5
+    assert _node_ids([flake.get_id()]) == {5}, "buffered IDs with the former node ID are discarded"
+
+    _wait_buffered(flake, 16)
+    assert _node_ids(flake.get_id() for _ in range(16)) == {5}
+    flake.close()
+
+
+def test_get_id_lease_expired(mocker, clock, pool):
+    flake = PrefetchingEasyFlake(
+        node_id=pool, node_id_bits=4, sequence_bits=10, clock=clock, low_water=4, high_water=16
+    )
+    _wait_buffered(flake, 16)
+    flake.get_id()
+    assert pool.get.call_count == 1
+
+    # the lease of the same node ID is renewed
+    monotonic = time.monotonic()
+    monotonic_mock = mocker.patch("time.monotonic", return_value=monotonic + 100)
+    pool.lease_expiry = monotonic + 160
+    flake.get_id()
+    assert flake.buffered > 0, "the buffer is kept while the node ID is held"
+
+    # the lease expires
+    monotonic_mock.return_value = monotonic + 200
+    flake.get_id()
+    assert pool.get.call_count > 1, "the node ID is asked again instead of the buffer"
+    flake.close()
+
+
+def test_invalid_water_marks():
+    with pytest.raises(ValueError):
+        PrefetchingEasyFlake(node_id=1, low_water=4, high_water=4)
@@ -1,9 +1,19 @@
+import asyncio
 from datetime import datetime, timedelta
 
 import pytest
 
-from easyflake.exceptions import SequenceOverflowError
-from easyflake.sequence import SimpleSequencePool, TimeSequence, TimeSequenceProvider
+from easyflake.clock import CoarseClock, MonotonicClock, SimulatedClock, TimeScale
+from easyflake.exceptions import ClockRollbackError, SequenceOverflowError
+from easyflake.sequence import (
+    LOCK_RETRY_INTERVAL,
+    RollbackPolicy,
+    SimpleSequencePool,
+    TimeSequence,
+    TimeSequenceProvider,
+    TimeSequenceRange,
+)
+from easyflake.state import SEQUENCE, TIMESTAMP
 
 
 def test_TimeSequenceProvider_get_required_bits(mocker):
@@ -59,6 +69,237 @@ def test_TimeSequenceProvider_next(mocker):
     sleep_mock.assert_not_called()
 
 
+def test_TimeSequenceProvider_reserve(mocker):
+    epoch = datetime(2023, 2, 8, 12, 24, 0).timestamp()
+    now = [datetime(2023, 2, 8, 12, 24, 12, 345000).timestamp()]
+
+    def sleep(seconds):
+        now[0] += 0.01
+
+    mocker.patch("time.time", side_effect=lambda: now[0])
+    sleep_mock = mocker.patch("time.sleep", side_effect=sleep)
+
+    provider = TimeSequenceProvider(bits=2, epoch=epoch, time_scale=2)
+    assert provider.next() == TimeSequence(timestamp=1234, value=0)
+
+    # 3 values remain in the current tick, the others are reserved on the next tick
+    actual = provider.reserve(6)
+    expected = [
+        TimeSequenceRange(timestamp=1234, start=1, stop=4),
+        TimeSequenceRange(timestamp=1235, start=0, stop=3),
+    ]
+    assert actual == expected, "reserved sequence is not contiguous"
+    sleep_mock.assert_called_once()
+
+    # the sequence continues after the reserved values
+    assert provider.next() == TimeSequence(timestamp=1235, value=3)
+
+
+def test_TimeSequenceProvider_reserve_clock_jump(mocker):
+    clock = SimulatedClock(2, 0, start=100)
+    wait_strategy = mocker.Mock()
+    provider = TimeSequenceProvider(
+        bits=1, epoch=0, time_scale=2, clock=clock, wait_strategy=wait_strategy
+    )
+    provider.next()
+    provider.next()
+
+    # the clock jumps between claiming the sequence and reading the clock to wait
+    claim = provider._claim
+
+    def claim_and_jump(count):
+        claimed = claim(count)
+        if claimed is None:
+            clock.advance(3)
+        return claimed
+
+    mocker.patch.object(provider, "_claim", side_effect=claim_and_jump)
+    assert provider.reserve(2) == [TimeSequenceRange(timestamp=103, start=0, stop=2)]
+    wait_strategy.wait.assert_not_called()
+
+
+def test_TimeSequenceProvider_next_raw(mocker):
+    epoch = datetime(2023, 2, 8, 12, 24, 0).timestamp()
+    mocker.patch("time.time", return_value=datetime(2023, 2, 8, 12, 24, 12, 345000).timestamp())
+
+    provider = TimeSequenceProvider(bits=2, epoch=epoch, time_scale=2)
+    assert provider.next_raw() == (1234, 0)
+    assert provider.next_raw() == (1234, 1)
+    assert provider.next() == TimeSequence(timestamp=1234, value=2)
+
+
+def test_TimeSequenceProvider_next_borrow_ahead(mocker):
+    epoch = datetime(2023, 2, 8, 12, 24, 0).timestamp()
+    mocker.patch("time.time", return_value=datetime(2023, 2, 8, 12, 24, 12, 345000).timestamp())
+    sleep_mock = mocker.patch("time.sleep", side_effect=StopIteration)
+
+    provider = TimeSequenceProvider(bits=1, epoch=epoch, time_scale=2, borrow_ticks=2)
+
+    expected = [(1234, 0), (1234, 1), (1235, 0), (1235, 1), (1236, 0), (1236, 1)]
+    for i, (timestamp, value) in enumerate(expected):
+        msg = f"ID generated ({i} times) is not equal to expected"
+        assert provider.next() == TimeSequence(timestamp=timestamp, value=value), msg
+    assert provider.lead == 2
+
+    sleep_mock.assert_not_called()
+
+    # the lead exceeds the bound
+    with pytest.raises(StopIteration):
+        provider.next()
+    sleep_mock.assert_called_once_with(0.01)
+
+
+def test_TimeSequenceProvider_invalid_borrow_ticks():
+    with pytest.raises(ValueError):
+        TimeSequenceProvider(bits=1, epoch=0, time_scale=2, borrow_ticks=-1)
+
+
+@pytest.fixture
+def rollback_time(mocker):
+    now = [datetime(2023, 2, 8, 12, 24, 12, 345000).timestamp()]
+    mocker.patch("time.time", side_effect=lambda: now[0])
+    return now
+
+
+def test_TimeSequenceProvider_rollback_reuse(mocker, rollback_time):
+    on_rollback = mocker.MagicMock()
+    provider = TimeSequenceProvider(bits=2, epoch=0, time_scale=2, on_rollback=on_rollback)
+    assert provider.next().timestamp == 167585905234
+
+    # the clock moves backwards by 3 ticks
+    rollback_time[0] -= 0.03
+    for i in range(1, 4):
+        assert provider.next() == TimeSequence(timestamp=167585905234, value=i)
+
+    assert provider.rollback_count == 1, "rollback should be counted once per event"
+    on_rollback.assert_called_once_with(3)
+
+
+def test_TimeSequenceProvider_rollback_wait(mocker, rollback_time):
+    def sleep(seconds):
+        rollback_time[0] += seconds
+
+    sleep_mock = mocker.patch("time.sleep", side_effect=sleep)
+
+    provider = TimeSequenceProvider(
+        bits=2, epoch=0, time_scale=2, rollback_policy=RollbackPolicy.WAIT, rollback_ticks=3
+    )
+    provider.next()
+
+    rollback_time[0] -= 0.02
+    assert provider.next() == TimeSequence(timestamp=167585905235, value=0)
+    sleep_mock.assert_called_once()
+    assert provider.rollback_count == 1
+
+    # too far behind
+    rollback_time[0] -= 0.05
+    with pytest.raises(ClockRollbackError):
+        provider.next()
+    assert provider.rollback_count == 2
+
+
+def test_TimeSequenceProvider_rollback_raise(rollback_time):
+    provider = TimeSequenceProvider(bits=2, epoch=0, time_scale=2, rollback_policy="raise")
+    provider.next()
+
+    rollback_time[0] -= 0.01
+    with pytest.raises(ClockRollbackError) as exc_info:
+        provider.next()
+    assert exc_info.value.ticks == 1
+
+
+def test_TimeSequenceProvider_coarse_clock_lag(mocker):
+    # the refresh thread is never run in time
+    mocker.patch("threading.Thread")
+    clock = CoarseClock(TimeScale.MILLI, 0, interval=0.002)
+    assert clock.lag_ticks == 2
+
+    provider = TimeSequenceProvider(
+        bits=2, epoch=0, time_scale=TimeScale.MILLI, rollback_policy="raise", clock=clock
+    )
+    # written by another process whose clock has been refreshed more recently
+    provider._state[TIMESTAMP] = clock.current() + 2
+    provider._state[SEQUENCE] = 1
+    assert provider.next_raw() == (clock.current() + 2, 1)
+    assert provider.rollback_count == 0
+
+    provider._state[TIMESTAMP] = clock.current() + 3
+    with pytest.raises(ClockRollbackError):
+        provider.next_raw()
+
+
+def test_TimeSequenceProvider_invalid_rollback_ticks():
+    with pytest.raises(ValueError):
+        TimeSequenceProvider(bits=1, epoch=0, time_scale=2, rollback_ticks=-1)
+
+
+def test_TimeSequenceProvider_clock(mocker):
+    mocker.patch("time.time_ns", return_value=1_000_000_000)
+    mocker.patch("time.monotonic_ns", return_value=0)
+
+    provider = TimeSequenceProvider(bits=2, epoch=0, time_scale=6, clock=MonotonicClock)
+    assert provider.next() == TimeSequence(timestamp=1_000_000, value=0)
+
+
+@pytest.mark.asyncio
+async def test_TimeSequenceProvider_anext_raw(mocker):
+    clock = SimulatedClock(2, 0, start=1234)
+    provider = TimeSequenceProvider(bits=1, epoch=0, time_scale=2, clock=clock)
+    sleep_mock = mocker.patch("time.sleep")
+
+    actual = [await provider.anext_raw() for _ in range(3)]
+    assert actual == [(1234, 0), (1234, 1), (1235, 0)]
+    sleep_mock.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_TimeSequenceProvider_anext_raw_contention(mocker):
+    provider = TimeSequenceProvider(bits=1, epoch=0, time_scale=2, clock=SimulatedClock(2, 0))
+    lock_mock = mocker.MagicMock()
+    lock_mock.acquire.side_effect = [False, True]
+    provider._shared.lock = lock_mock
+
+    sleep_mock = mocker.patch("asyncio.sleep", wraps=asyncio.sleep)
+    assert await provider.anext_raw() == (0, 0)
+    assert lock_mock.acquire.call_count == 2
+    sleep_mock.assert_called_once_with(LOCK_RETRY_INTERVAL)
+    lock_mock.acquire.assert_called_with(False)
+    lock_mock.release.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_TimeSequenceProvider_areserve():
+    clock = SimulatedClock(2, 0, start=1234)
+    provider = TimeSequenceProvider(bits=2, epoch=0, time_scale=2, clock=clock)
+
+    actual = await provider.areserve(6)
+    expected = [
+        TimeSequenceRange(timestamp=1234, start=0, stop=4),
+        TimeSequenceRange(timestamp=1235, start=0, stop=2),
+    ]
+    assert actual == expected
+
+    with pytest.raises(ValueError):
+        await provider.areserve(0)
+
+
+def test_TimeSequenceProvider_reserve_invalid():
+    provider = TimeSequenceProvider(bits=2, epoch=0, time_scale=2)
+    with pytest.raises(ValueError):
+        provider.reserve(0)
+
+
+def test_TimeSequenceProvider_wide_sequence():
+    clock = SimulatedClock(2, 0, start=10)
+    provider = TimeSequenceProvider(bits=63, epoch=0, time_scale=2, clock=clock)
+
+    assert provider.next() == TimeSequence(timestamp=10, value=0)
+    assert provider.reserve(3) == [TimeSequenceRange(timestamp=10, start=1, stop=4)]
+
+    with pytest.raises(ValueError):
+        TimeSequenceProvider(bits=64, epoch=0, time_scale=2)
+
+
 def test_SimpleSequencePool_pop():
     bits = 2
     expected_set = {0, 1, 2, 3}
@@ -0,0 +1,147 @@
+import multiprocessing
+import sys
+import threading
+
+import pytest
+
+from easyflake import EasyFlake, NamedSequenceState, SimulatedClock
+from easyflake.exceptions import SequenceOverflowError
+from easyflake.sequence import TimeSequenceProvider
+from easyflake.state import (
+    SEQUENCE,
+    TIMESTAMP,
+    LocalSequenceState,
+    StripedSequenceState,
+)
+
+
+def _get_ids(directory: str, n: int):
+    ef = EasyFlake(
+        node_id=1, sequence_bits=16, state=NamedSequenceState("test", directory=directory)
+    )
+    return [ef.get_id() for _ in range(n)]
+
+
+def test_LocalSequenceState():
+    state = LocalSequenceState()
+    with state.lock:
+        state.words[TIMESTAMP] = 10
+        state.words[SEQUENCE] = 2**63
+    assert list(state.words) == [10, 2**63]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_NamedSequenceState(tmp_path):
+    first = NamedSequenceState("test", directory=str(tmp_path))
+    second = NamedSequenceState("test", directory=str(tmp_path))
+    assert list(first.words) == [0, 0], "a new state should be filled with zeros"
+
+    with first.lock:
+        first.words[TIMESTAMP] = 10
+        first.words[SEQUENCE] = 3
+    assert list(second.words) == [10, 3], "the same name should share the state"
+
+    # the lock excludes the other threads of the same process as well
+    assert first.lock.acquire()
+    assert not second.lock.acquire(False)
+    first.lock.release()
+    assert second.lock.acquire(False)
+    second.lock.release()
+
+    first.unlink()
+    third = NamedSequenceState("test", directory=str(tmp_path))
+    assert list(third.words) == [0, 0], "an unlinked name should not be shared"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+@pytest.mark.parametrize("name", ["", "a/b"])
+def test_NamedSequenceState_invalid_name(tmp_path, name):
+    with pytest.raises(ValueError):
+        NamedSequenceState(name, directory=str(tmp_path))
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_NamedSequenceState_shared_by_providers(tmp_path):
+    clock = SimulatedClock(2, 0, start=100)
+    options = {"node_id": 1, "sequence_bits": 2, "clock": clock}
+    first = EasyFlake(**options, state=NamedSequenceState("test", directory=str(tmp_path)))
+    second = EasyFlake(**options, state=NamedSequenceState("test", directory=str(tmp_path)))
+
+    ids = [ef.get_id() for _ in range(5) for ef in (first, second)]
+    assert ids == sorted(set(ids)), "IDs should be unique and ordered"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_NamedSequenceState_shared_by_independent_processes(tmp_path):
+    # spawned processes are not forked from the creator of the state
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(2) as pool:
+        results = pool.starmap(_get_ids, [(str(tmp_path), 2000)] * 2)
+
+    ids = [i for result in results for i in result]
+    assert len(set(ids)) == len(ids), "IDs should be unique across processes"
+
+
+def _send_ids(conn, ef: EasyFlake, n: int, exit_event):
+    try:
+        conn.send([ef.get_id() for _ in range(n)])
+    except SequenceOverflowError as e:
+        conn.send(type(e).__name__)
+    exit_event.wait()
+
+
+def _start_child(ef: EasyFlake, n: int, exit_event):
+    # arguments are inherited by fork without pickling
+    ctx = multiprocessing.get_context("fork")
+    conn, child_conn = ctx.Pipe()
+    process = ctx.Process(target=_send_ids, args=(child_conn, ef, n, exit_event), daemon=True)
+    process.start()
+    return process, conn.recv()
+
+
+def _get_ids_in_child(ef: EasyFlake, n: int):
+    exit_event = multiprocessing.get_context("fork").Event()
+    exit_event.set()
+    process, result = _start_child(ef, n, exit_event)
+    process.join()
+    return result
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_StripedSequenceState():
+    clock = SimulatedClock(2, 0, start=100)
+    state = StripedSequenceState(2)
+    ef = EasyFlake(node_id=0, node_id_bits=4, sequence_bits=4, clock=clock, state=state)
+    assert state.lane == 0
+
+    # the lane is the high bits of the sequence
+    assert ef.get_ids(5) == [100 << 8 | i for i in (0, 1, 2, 3)] + [101 << 8]
+    assert isinstance(state.lock, type(threading.Lock()))
+
+    child_ids = _get_ids_in_child(ef, 5)
+    assert [ef.decode(i).sequence >> 2 for i in child_ids] == [1] * 5, "child uses the next lane"
+    assert not set(child_ids) & set(ef.get_ids(5))
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not supported")
+def test_StripedSequenceState_lanes_exhausted():
+    state = StripedSequenceState(1)
+    ef = EasyFlake(node_id=0, node_id_bits=4, sequence_bits=4, state=state)
+    exit_event = multiprocessing.get_context("fork").Event()
+
+    # the lane of a process is kept while it is alive
+    process, result = _start_child(ef, 1, exit_event)
+    assert isinstance(result, list)
+    assert _get_ids_in_child(ef, 1) == "SequenceOverflowError", "no lane should be left"
+    exit_event.set()
+    process.join()
+
+    # the lane of an exited process is reused
+    assert isinstance(_get_ids_in_child(ef, 1), list)
+
+
+def test_StripedSequenceState_invalid_lane_bits():
+    with pytest.raises(ValueError):
+        StripedSequenceState(0)
+    with pytest.raises(ValueError):
+        TimeSequenceProvider(bits=2, epoch=0, time_scale=2, state=StripedSequenceState(2))
@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from easyflake.clock import BaseClock, MonotonicClock, TimeScale
+from easyflake.wait import HybridWait, SleepWait, SpinWait, calibrate_sleep
+
+
+@pytest.fixture
+def clock_mock():
+    clock = MagicMock(spec=BaseClock)
+    clock.tick_ns = 1000  # micro seconds
+    return clock
+
+
+def test_SleepWait(clock_mock):
+    SleepWait().wait(clock_mock, 1, 3)
+    clock_mock.sleep.assert_called_once_with(1, 3)
+    clock_mock.spin.assert_not_called()
+
+
+def test_SpinWait(clock_mock):
+    SpinWait().wait(clock_mock, 1, 3)
+    clock_mock.spin.assert_called_once_with(3)
+    clock_mock.sleep.assert_not_called()
+
+
+def test_HybridWait(clock_mock):
+    strategy = HybridWait(threshold=0.00005)
+
+    # 20 micro seconds
+    strategy.wait(clock_mock, 0, 20)
+    clock_mock.spin.assert_called_once_with(20)
+    clock_mock.sleep.assert_not_called()
+
+    # 50 micro seconds
+    strategy.wait(clock_mock, 0, 50)
+    clock_mock.sleep.assert_called_once_with(0, 50)
+
+
+def test_HybridWait_calibrate(mocker):
+    calibrate_mock = mocker.patch("easyflake.wait.calibrate_sleep", return_value=0.0001)
+    assert HybridWait().threshold_ns == 100_000
+    calibrate_mock.assert_called_once()
+
+
+def test_calibrate_sleep():
+    assert calibrate_sleep() > 0
+
+
+def test_spin():
+    clock = MonotonicClock(TimeScale.MICRO, 0)
+    future = clock.current() + 50
+    SpinWait().wait(clock, future - 50, future)
+    assert clock.current() >= future